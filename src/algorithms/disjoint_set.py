@@ -3,7 +3,8 @@ Disjoint Set data structure
 Also known as Union Find
 '''
 
-from typing import List, Any
+from array import array
+from typing import List, Any, Sequence
 
 
 class DisjointSet:
@@ -60,6 +61,100 @@ class DisjointSet:
         return root_a
 
 
+class CompactDisjointSet:
+    '''
+    Same as DisjointSet but for items 0, 1, ..., num_items - 1 only, so there's no list of items.
+    parent is an array of 4-byte ints and rank is a single byte per item (rank of a tree
+    with n items is at most log2(n), so it never crosses 255). That's 5 bytes per item,
+    instead of 16+ bytes for each item in Python lists
+    '''
+
+    def __init__(self, num_items: int):
+        self.num_items = num_items
+
+        # make every item its own parent
+        self.parent = array('i', range(num_items))
+
+        # upper bound of the height of tree rooted at each item, used to keep trees shallow
+        self.rank = bytearray(num_items)
+
+        # number of disjoint sets, every item is its own set at the start
+        self.num_sets = num_items
+
+    def find(self, x: int) -> int:
+        # find root node for given node x
+        # path halving: point every other node on the path to its grandparent.
+        # flattens the tree like path compression, but in a single iterative pass
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> int:
+        # combines sets of a & b into a single tree and returns its root
+        root_a = self.find(a)
+        root_b = self.find(b)
+
+        if root_a == root_b:
+            return root_a
+
+        # attach the shorter tree under the taller one
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+
+        self.num_sets -= 1
+        return root_a
+
+    def connected(self, a: int, b: int) -> bool:
+        return self.find(a) == self.find(b)
+
+    def find_many(self, items: Sequence[int]) -> array:
+        # roots of all the given items
+        find = self.find
+        return array('i', (find(x) for x in items))
+
+    def union_many(self, items_a: Sequence[int], items_b: Sequence[int]) -> bytearray:
+        # unions items_a[i] with items_b[i] for every i, in order.
+        # returns a flag per pair, 1 if it joined two different sets and 0 if they were already
+        # in the same set. e.g. for Kruskal's these flags mark the edges of spanning tree
+        parent = self.parent
+        rank = self.rank
+
+        merged = bytearray(len(items_a))
+
+        for idx, (a, b) in enumerate(zip(items_a, items_b)):
+            # find, inlined for speed
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+
+            if a == b:
+                continue
+
+            if rank[a] < rank[b]:
+                a, b = b, a
+            parent[b] = a
+            if rank[a] == rank[b]:
+                rank[a] += 1
+
+            merged[idx] = 1
+
+        self.num_sets -= merged.count(1)
+        return merged
+
+    def connected_components(self) -> array:
+        # snapshot of the sets: the root of every item. items with same root are in the same set
+        return self.find_many(range(self.num_items))
+
+
 if __name__ == '__main__':
     # test
 
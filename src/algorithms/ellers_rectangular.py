@@ -0,0 +1,154 @@
+from array import array
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.random_source import make_rng
+
+
+class EllersRectangular:
+    '''
+    Creates a rectangular maze one row at a time using Eller's algorithm.
+
+    Only the current row is kept in memory: the set (connected part of the maze so far)
+    of every cell of the row. So a maze can have any number of rows, memory only grows
+    with the length of a row.
+
+    For every row:
+    1. cells not connected to the row above start a new set
+    2. neighbours in different sets are joined at random (all of them in the last row)
+    3. every set gets at least one passage down, so no part of the maze is cut off,
+       the cells below continue the set
+
+    Every row is a bytearray with a bitmask of passages per cell, bits TOP, RIGHT, BOTTOM, LEFT
+    (same as KruskalRectangular). Rows one after another are the passages of the whole maze,
+    for a square maze exactly MazeGraph.passages of KruskalRectangular(row_len).topology
+    '''
+
+    def __init__(self, row_len, join_chance=0.5, down_chance=0.5):
+        self.row_len = row_len
+
+        # chance that two neighbours in different sets are joined, and that a cell has a passage down.
+        # lower join_chance makes vertical corridors, lower down_chance horizontal ones
+        self.join_chance = join_chance
+        self.down_chance = down_chance
+
+        self.TOP = 0
+        self.RIGHT = 1
+        self.BOTTOM = 2
+        self.LEFT = 3
+
+    def rows(self, num_rows, rng=None):
+        # yields the num_rows rows of a maze
+        rng = make_rng(rng)
+        random = rng.random
+
+        row_len = self.row_len
+        join_chance = self.join_chance
+        down_chance = self.down_chance
+
+        top_bit = 1 << self.TOP
+        right_bit = 1 << self.RIGHT
+        bottom_bit = 1 << self.BOTTOM
+        left_bit = 1 << self.LEFT
+
+        # set of every cell of the row, -1 if not connected to the row above.
+        # sets are numbered 0 to row_len - 1, there can't be more sets than cells in a row
+        sets = array('i', [-1]) * row_len
+
+        # union find over the sets of the row
+        parent = array('i', range(row_len))
+
+        def find(item):
+            while parent[item] != item:
+                # path halving
+                parent[item] = parent[parent[item]]
+                item = parent[item]
+            return item
+
+        # 1 if the cell of the row above has a passage down to this cell
+        from_above = bytearray(row_len)
+
+        for row_idx in range(num_rows):
+            is_last_row = row_idx == num_rows - 1
+
+            row = bytearray(row_len)
+
+            # 1. cells not connected to the row above get the sets no other cell has
+            used = bytearray(row_len)
+            for cell_set in sets:
+                if cell_set >= 0:
+                    used[cell_set] = 1
+            free_sets = (cell_set for cell_set in range(row_len) if not used[cell_set])
+
+            for col in range(row_len):
+                if from_above[col]:
+                    row[col] = top_bit
+                else:
+                    sets[col] = next(free_sets)
+
+            parent[:] = array('i', range(row_len))
+
+            # 2. join neighbours in different sets
+            for col in range(row_len - 1):
+                root = find(sets[col])
+                right_root = find(sets[col + 1])
+
+                if root != right_root and (is_last_row or random() < join_chance):
+                    parent[right_root] = root
+                    row[col] |= right_bit
+                    row[col + 1] |= left_bit
+
+            if is_last_row:
+                yield row
+                return
+
+            # 3. passages down. has_down[set] is 1 once the set has one. every set also picks one of
+            # its cells at random (reservoir sampling, one pass), which goes down if the set has none
+            roots = array('i', [find(cell_set) for cell_set in sets])
+            has_down = bytearray(row_len)
+            num_seen = array('i', bytes(4 * row_len))
+            picked = array('i', bytes(4 * row_len))
+
+            for col in range(row_len):
+                root = roots[col]
+
+                num_seen[root] += 1
+                if random() * num_seen[root] < 1:
+                    picked[root] = col
+
+                if random() < down_chance:
+                    from_above[col] = 1
+                    has_down[root] = 1
+                else:
+                    from_above[col] = 0
+
+            for col in range(row_len):
+                root = roots[col]
+                if not has_down[root]:
+                    from_above[picked[root]] = 1
+                    has_down[root] = 1
+
+            # cells below continue the sets of the cells with a passage down
+            for col in range(row_len):
+                if from_above[col]:
+                    row[col] |= bottom_bit
+                    sets[col] = roots[col]
+                else:
+                    sets[col] = -1
+
+            yield row
+
+
+if __name__ == '__main__':
+    # prints a maze row by row, as soon as each row is created
+    ellers = EllersRectangular(12)
+
+    print('_' * (2 * ellers.row_len + 1))
+    for maze_row in ellers.rows(8):
+        line = '|'
+        for passages in maze_row:
+            line += ' ' if passages >> ellers.BOTTOM & 1 else '_'
+            line += ' ' if passages >> ellers.RIGHT & 1 else '|'
+        print(line)
@@ -1,8 +1,19 @@
 import pprint
-import random
+from array import array
 from typing import Tuple
 
-from disjoint_set import DisjointSet
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.disjoint_set import CompactDisjointSet
+from algorithms.level_layout import TriangularLayout
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
+
+
+# edges are joined this many at a time, so the ones left once the spanning tree is complete are skipped
+EDGE_CHUNK_SIZE = 4096
 
 
 class KruskalRandomized:
@@ -21,6 +32,9 @@ class KruskalRandomized:
 
         self.total_cells = sum(self.num_cells_at_level)
 
+        # converts between 1D & 2D indices
+        self.layout = TriangularLayout(num_levels)
+
         self.PARENT = 0
         self.LEFT = 1
         self.RIGHT = 2
@@ -28,108 +42,83 @@ class KruskalRandomized:
 
     def create_graph(self):
         # creates a graph aligned with triangular pattern
+        # each cell has a slot for PARENT, LEFT, RIGHT, CHILD neighbours
 
-        graph = {
-            cell: [0, 0, 0, 0] for cell in range(self.total_cells)
-        }
-
-        edges = []
+        neighbours = [NO_NEIGHBOUR for _ in range(4 * self.total_cells)]
 
         for lvl in range(self.num_levels):
             num_triangles = 2 * lvl + 1
 
             for tri in range(num_triangles):
-                # sum all triangles in previous levels, add current level's triangle index
-                index_1d = sum(self.num_cells_at_level[:lvl]) + tri
+                # all triangles in previous levels + current level's triangle index
+                index_1d = self.layout.index_1d(lvl, tri)
 
                 if tri > 0:
-                    graph[index_1d][self.LEFT] = 1
                     left_1d = index_1d - 1
-                    edges.append((index_1d, left_1d))
+                    neighbours[4 * index_1d + self.LEFT] = left_1d
 
                 if tri < num_triangles - 1:
-                    graph[index_1d][self.RIGHT] = 1
                     right_1d = index_1d + 1
-                    edges.append((index_1d, right_1d))
+                    neighbours[4 * index_1d + self.RIGHT] = right_1d
 
                 if tri % 2 == 0 and lvl < self.num_levels - 1:
                     # all even indexed triangles are connected downward
-                    graph[index_1d][self.CHILD] = 1
-                    child_1d = sum(self.num_cells_at_level[:lvl+1]) + tri + 1  # index of child
-                    edges.append((index_1d, child_1d))
+                    child_1d = self.layout.index_1d(lvl + 1, tri + 1)  # index of child
+                    neighbours[4 * index_1d + self.CHILD] = child_1d
 
                 elif tri % 2 != 0 and lvl > 0:
-                    graph[index_1d][self.PARENT] = 1
-                    parent_1d = sum(self.num_cells_at_level[:lvl - 1]) + tri - 1  # index of child
-                    edges.append((index_1d, parent_1d))
+                    parent_1d = self.layout.index_1d(lvl - 1, tri - 1)  # index of parent
+                    neighbours[4 * index_1d + self.PARENT] = parent_1d
 
-        return graph, edges
+        # PARENT <-> CHILD, LEFT <-> RIGHT
+        return MazeTopology.fixed_degree(neighbours, 4, opposite=(self.CHILD, self.RIGHT, self.LEFT, self.PARENT))
 
-    def kruskal_spanning_tree(self, edges):
-        # creates Spanning Tree using Randomized Kruskal's
+    def kruskal_spanning_tree(self, topology: MazeTopology, rng=None):
+        # creates Spanning Tree using Randomized Kruskal's:
+        # goes through the edges of topology (created by create_graph) in random order
+        # and adds an edge only if its cells are not already connected, so there are no cycles
+        rng = make_rng(rng)
 
         # the minimum spanning tree has no edges in the start
         # PARENT, LEFT, RIGHT, CHILD
-        spanning_tree = {
-            cell: [0, 0, 0, 0] for cell in range(self.total_cells)
-        }
-
-        # list of nodes to visit
-        to_visit = [node for node in range(self.total_cells)]
-
-        # let's start Kruskal by visiting the first node
-        visited = []
-
-        # cell indices will be used in disjoint set and then to map back to real edge
-        cells = [idx for idx in range(len(edges))]
+        spanning_tree = MazeGraph(topology)
 
-        disjoint = DisjointSet(cells)
+        # neighbours[4 * cell + direction] is the neighbour of cell in that direction
+        neighbours = topology.neighbours
 
-        while len(visited) < self.total_cells:
-            # pick one edge at random, connecting to a new cell that is not already in visited.
-            edge_idx = random.randint(0, len(edges)-1)
-            edge = edges[edge_idx]
-            cell1, cell2 = edge
+        # every edge exactly once, as its index in neighbours (4 * cell + direction), 4 bytes each.
+        # RIGHT & CHILD cover all the edges, LEFT & PARENT are the same edges seen from the other cell
+        edges = array('i', (
+            edge for cell in range(self.total_cells) for edge in (4 * cell + self.RIGHT, 4 * cell + self.CHILD)
+            if neighbours[edge] != NO_NEIGHBOUR
+        ))
 
-            if cell1 in visited and cell2 in visited:
-                # both cells already included, this edge is redundant
-                edges.pop(edge_idx)
-                continue
+        rng.shuffle(edges)
 
-            # else, at least one of the cell is not part of spanning tree,
-            # so connect both to include that
-            disjoint.union(cell1, cell2)
+        # union find over cells. goes through the edges in order and flags the ones
+        # whose cells were not already connected, these make the spanning tree
+        disjoint = CompactDisjointSet(self.total_cells)
 
-            # connect these two nodes in the minimum spanning tree
-            direction = self.get_neighbour_dir(cell1, cell2)
-            spanning_tree[cell1][direction] = 1
+        for start in range(0, len(edges), EDGE_CHUNK_SIZE):
+            # a spanning tree has total_cells - 1 edges, once they are all there the rest would only make cycles
+            if disjoint.num_sets == 1:
+                break
 
-            # also set it for the neighbour
-            neighbour_dir = self.get_neighbour_dir(cell2, cell1)
-            spanning_tree[cell2][neighbour_dir] = 1
+            chunk = edges[start:start + EDGE_CHUNK_SIZE]
+            merged = disjoint.union_many(array('i', (edge >> 2 for edge in chunk)),
+                                         array('i', (neighbours[edge] for edge in chunk)))
 
-            # add to visited
-            if cell1 not in visited:
-                visited.append(cell1)
-            if cell2 not in visited:
-                visited.append(cell2)
+            for edge, is_merged in zip(chunk, merged):
+                if is_merged:
+                    # connect these two cells in the spanning tree (and vice versa)
+                    # the direction is already part of the edge
+                    spanning_tree.connect(edge >> 2, edge & 3)
 
         return spanning_tree
 
     def index_2d(self, cell_1d) -> Tuple[int, int]:
         # takes index of cell in 1-D array form and converts to 2D
-        if cell_1d >= self.total_cells:
-            raise Exception("1D index greater than total number of cells")
-
-        level = 0
-        while cell_1d - self.num_cells_at_level[level] >= 0:
-            cell_1d -= self.num_cells_at_level[level]
-            level += 1
-
-        # the remaining cells give the index of cell at current level
-        cell = cell_1d
-
-        return level, cell
+        return self.layout.index_2d(cell_1d)
 
     def get_neighbour_dir(self, cell1, cell2):
         '''
@@ -154,14 +143,31 @@ class KruskalRandomized:
             return self.PARENT
 
 
+    @staticmethod
+    def test():
+        # property check: for many sizes, the spanning tree has exactly total_cells - 1 edges
+        # and connects all the cells
+        for num_levels in list(range(1, 40)) + [1000]:
+            kr = KruskalRandomized(num_levels)
+            topology = kr.create_graph()
+            spanning_tree = kr.kruskal_spanning_tree(topology)
+
+            assert spanning_tree.num_edges() == kr.total_cells - 1, f'wrong number of edges for {num_levels} levels'
+            assert spanning_tree.is_spanning_tree(), f'cells not connected for {num_levels} levels'
+
+        print('Kruskal Spanning Tree is valid for all sizes')
+
+
 if __name__ == '__main__':
     # number of nodes in a row
     n = 4
     kr = KruskalRandomized(n)
 
-    graph, edges = kr.create_graph()
+    topology = kr.create_graph()
 
     print("Kruskal Spanning Tree (as adjacency list):")
     pprint.pp(
-        kr.kruskal_spanning_tree(edges)
+        kr.kruskal_spanning_tree(topology).to_adjacency_list()
     )
+
+    KruskalRandomized.test()
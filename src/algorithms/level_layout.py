@@ -0,0 +1,140 @@
+'''
+Conversion between 1D and 2D (level, cell) indices for mazes made of levels
+(triangular, hexagonal and circular mazes)
+
+Cells are numbered level by level. offsets[level] is the number of cells in all
+the previous levels, i.e. the 1D index of the first cell of that level. It is
+computed once, so both conversions take O(1) (or O(log levels)) instead of
+summing up the previous levels on every call.
+
+The *_many methods convert whole arrays of indices at once. They use NumPy if it
+is installed, otherwise they fall back to converting one index at a time.
+'''
+
+import math
+from array import array
+from bisect import bisect_right
+from typing import Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LevelLayout:
+
+    def __init__(self, num_cells_at_level: Sequence[int]):
+        self.num_cells_at_level = list(num_cells_at_level)
+        self.num_levels = len(self.num_cells_at_level)
+
+        # prefix sums of cells per level, has num_levels + 1 items. the last one is total cells
+        self.offsets = [0]
+        for num_cells in self.num_cells_at_level:
+            self.offsets.append(self.offsets[-1] + num_cells)
+
+        self.total_cells = self.offsets[-1]
+
+    def index_1d(self, level, cell) -> int:
+        # takes the level & cell (the 2D indices) and converts them to their corresponding 1D index
+        if level >= self.num_levels:
+            raise Exception("level greater than maze levels")
+        return self.offsets[level] + cell
+
+    def index_2d(self, idx) -> Tuple[int, int]:
+        # takes index of cell in 1-D array form and converts to 2D
+        if idx >= self.total_cells:
+            raise Exception("1D index greater than total number of cells")
+
+        level = self.level_of(idx)
+        return level, idx - self.offsets[level]
+
+    def level_of(self, idx) -> int:
+        # the last level whose first cell is not after idx
+        return bisect_right(self.offsets, idx) - 1
+
+    def index_1d_many(self, levels, cells):
+        # batch version of index_1d for arrays of levels & cells
+        if np is not None:
+            levels = np.asarray(levels, dtype=np.int64)
+            if levels.size > 0 and levels.max() >= self.num_levels:
+                raise Exception("level greater than maze levels")
+            return np.asarray(self.offsets, dtype=np.int64)[levels] + np.asarray(cells, dtype=np.int64)
+
+        return array('q', (self.index_1d(level, cell) for level, cell in zip(levels, cells)))
+
+    def index_2d_many(self, indices):
+        # batch version of index_2d, returns arrays of levels & cells
+        if np is not None:
+            indices = np.asarray(indices, dtype=np.int64)
+            if indices.size > 0 and indices.max() >= self.total_cells:
+                raise Exception("1D index greater than total number of cells")
+
+            levels = self._levels_of_many(indices)
+            return levels, indices - np.asarray(self.offsets, dtype=np.int64)[levels]
+
+        levels = array('q')
+        cells = array('q')
+        for idx in indices:
+            level, cell = self.index_2d(idx)
+            levels.append(level)
+            cells.append(cell)
+        return levels, cells
+
+    def _levels_of_many(self, indices):
+        return np.searchsorted(np.asarray(self.offsets, dtype=np.int64), indices, side='right') - 1
+
+
+class TriangularLayout(LevelLayout):
+    '''
+    level l of triangular maze has 2*l + 1 cells, so the levels before it have
+    1 + 3 + 5 + ... + (2*l - 1) = l^2 cells. level of a 1D index is its integer square root.
+    both conversions are closed form, so no prefix table is stored
+    '''
+
+    def __init__(self, num_levels):
+        self.num_levels = num_levels
+        self.total_cells = num_levels ** 2
+
+    def index_1d(self, level, cell) -> int:
+        if level >= self.num_levels:
+            raise Exception("level greater than maze levels")
+        return level * level + cell
+
+    def index_2d(self, idx) -> Tuple[int, int]:
+        if idx >= self.total_cells:
+            raise Exception("1D index greater than total number of cells")
+
+        level = math.isqrt(idx)
+        return level, idx - level * level
+
+    def level_of(self, idx) -> int:
+        return math.isqrt(idx)
+
+    def index_1d_many(self, levels, cells):
+        if np is not None:
+            levels = np.asarray(levels, dtype=np.int64)
+            if levels.size > 0 and levels.max() >= self.num_levels:
+                raise Exception("level greater than maze levels")
+            return levels * levels + np.asarray(cells, dtype=np.int64)
+
+        return super().index_1d_many(levels, cells)
+
+    def index_2d_many(self, indices):
+        if np is not None:
+            indices = np.asarray(indices, dtype=np.int64)
+            if indices.size > 0 and indices.max() >= self.total_cells:
+                raise Exception("1D index greater than total number of cells")
+
+            levels = self._levels_of_many(indices)
+            return levels, indices - levels * levels
+
+        return super().index_2d_many(indices)
+
+    def _levels_of_many(self, indices):
+        levels = np.sqrt(indices).astype(np.int64)
+
+        # float sqrt can be off by one for very large indices, fix those
+        levels -= levels * levels > indices
+        levels += (levels + 1) * (levels + 1) <= indices
+        return levels
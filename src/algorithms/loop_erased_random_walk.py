@@ -1,7 +1,90 @@
+from array import array
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
+
 
 class LoopErasedRandomWalk:
+    '''
+    Creates a Spanning Tree using Wilson's algorithm (loop-erased random walks).
+    Unlike DFS, Prim's & Kruskal's it picks every possible spanning tree with the same
+    probability (uniform spanning tree), so the mazes are not biased towards long
+    corridors or short dead ends.
+
+    Works on the topology of any shape (MazeTopology).
+
+    1. Start with a tree containing a single random cell.
+    2. From a cell not in the tree, walk randomly until the walk hits the tree.
+    3. Add the walk to the tree, without the loops it made.
+    4. Repeat 2 & 3 until every cell is in the tree.
+
+    The loops are not erased from a list of cells of the walk. Every cell only remembers the
+    direction it was last left in (next pointer), stored in a flat array. When the walk comes back
+    to a cell, leaving it again overwrites its direction, which is exactly erasing the loop.
+    Following the next pointers from the start of the walk gives the loop-erased path.
+    '''
+
+    def __init__(self, topology: MazeTopology):
+        self.topology = topology
+        self.total_cells = topology.num_cells
+
+        # neighbours of every cell without empty slots (CSR), so a random neighbour is
+        # picked in a single step. slots[idx] is the slot of neighbours[idx] in the topology
+        self.offsets = array('i', [0])
+        self.neighbours = array('i')
+        self.slots = array('B')
+
+        topology_offsets = topology.offsets
+        topology_neighbours = topology.neighbours
+
+        for cell in range(self.total_cells):
+            start = topology_offsets[cell]
+            for idx in range(start, topology_offsets[cell + 1]):
+                if topology_neighbours[idx] != NO_NEIGHBOUR:
+                    self.neighbours.append(topology_neighbours[idx])
+                    self.slots.append(idx - start)
+            self.offsets.append(len(self.neighbours))
+
+    def spanning_tree(self, rng=None) -> MazeGraph:
+        rng = make_rng(rng)
+        random = rng.random
+
+        offsets = self.offsets
+        neighbours = self.neighbours
+        slots = self.slots
+
+        spanning_tree = MazeGraph(self.topology)
+
+        if self.total_cells == 0:
+            return spanning_tree
+
+        # in_tree[cell] is 1 once the cell is part of the spanning tree
+        in_tree = bytearray(self.total_cells)
+        in_tree[rng.randrange(self.total_cells)] = 1
+
+        # next_idx[cell] is the index (in neighbours) of the neighbour the walk last moved to from cell
+        next_idx = array('i', bytes(4 * self.total_cells))
+
+        # the walks can start from the cells in any order, the tree is uniform either way
+        for start in range(self.total_cells):
+            # random walk till the tree is hit, remembering only the last move from every cell
+            cell = start
+            while not in_tree[cell]:
+                first = offsets[cell]
+                idx = first + int(random() * (offsets[cell + 1] - first))
+                next_idx[cell] = idx
+                cell = neighbours[idx]
 
-    def __init__(self):
-        pass
+            # add the loop-erased walk to the tree
+            cell = start
+            while not in_tree[cell]:
+                in_tree[cell] = 1
+                idx = next_idx[cell]
+                spanning_tree.connect(cell, slots[idx])
+                cell = neighbours[idx]
 
-    
\ No newline at end of file
+        return spanning_tree
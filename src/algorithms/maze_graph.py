@@ -0,0 +1,203 @@
+'''
+Compact graph shared by all the maze shapes
+
+MazeTopology describes which cell neighbours which one. It is stored in CSR
+(Compressed Sparse Row) form: neighbours of a cell are kept in a single flat
+array, from offsets[cell] till offsets[cell + 1]. The position of a neighbour
+inside that range is called its slot. For shapes where every cell has the same
+directions (rectangular, triangular, hexagonal) the slot is the direction itself
+and missing neighbours (boundary cells) are stored as -1.
+
+MazeGraph is a spanning tree (or any subgraph) on top of a topology. For every
+cell it only keeps a bitmask of open passages, bit i is set if the cell is connected
+to the neighbour in slot i. That's 1 byte per cell (2 bytes if cells have more than
+8 neighbours, like the center of circular maze). The topology is shared by every
+maze of the same shape and size.
+'''
+
+import operator
+from array import array
+from typing import List, Sequence, Optional
+
+
+# the value stored in neighbours array when there's no neighbour in that slot
+NO_NEIGHBOUR = -1
+
+
+class MazeTopology:
+
+    def __init__(self, offsets: Sequence[int], neighbours: Sequence[int], opposite: Optional[Sequence[int]] = None):
+        '''
+        offsets: offsets[cell] is the index in neighbours where cell's neighbours start. has num_cells + 1 items
+        neighbours: flat list of neighbour cells, NO_NEIGHBOUR for empty slots
+        opposite: for shapes with fixed directions, opposite[direction] is the direction of
+            the cell as seen from its neighbour. e.g. TOP <-> BOTTOM in a square grid.
+            if not provided, it is computed for every slot
+        '''
+        self.offsets = array('i', offsets)
+        self.neighbours = array('i', neighbours)
+
+        self.num_cells = len(self.offsets) - 1
+
+        self.max_degree = max(map(operator.sub, self.offsets[1:], self.offsets[:-1]), default=0)
+
+        self.opposite = tuple(opposite) if opposite is not None else None
+
+        # back_slots[offsets[cell] + slot] is the slot of cell among the neighbours of neighbour
+        # only needed when the shape does not have fixed directions
+        self.back_slots = None
+        if self.opposite is None:
+            self.back_slots = self._compute_back_slots()
+
+    @classmethod
+    def fixed_degree(cls, neighbours: Sequence[int], degree: int, opposite: Sequence[int]):
+        # topology where each cell has the same number of slots (directions)
+        num_cells = len(neighbours) // degree
+        return cls(range(0, num_cells * degree + 1, degree), neighbours, opposite)
+
+    @classmethod
+    def from_neighbour_lists(cls, neighbour_lists: List[List[int]]):
+        # topology from a list containing the list of neighbours of each cell
+        offsets = [0]
+        neighbours = []
+        for cell_neighbours in neighbour_lists:
+            neighbours.extend(cell_neighbours)
+            offsets.append(len(neighbours))
+
+        return cls(offsets, neighbours)
+
+    def _compute_back_slots(self):
+        back_slots = array('B', bytes(len(self.neighbours)))
+
+        for cell in range(self.num_cells):
+            for idx in range(self.offsets[cell], self.offsets[cell + 1]):
+                neighbour = self.neighbours[idx]
+                if neighbour == NO_NEIGHBOUR:
+                    continue
+
+                back_slot = self.slot_of(neighbour, cell)
+                if back_slot is None:
+                    raise Exception(f'Cell {neighbour} is a neighbour of {cell} but not vice versa')
+                back_slots[idx] = back_slot
+
+        return back_slots
+
+    def degree(self, cell) -> int:
+        # number of slots of cell (including empty ones)
+        return self.offsets[cell + 1] - self.offsets[cell]
+
+    def neighbour(self, cell, slot) -> int:
+        return self.neighbours[self.offsets[cell] + slot]
+
+    def neighbours_of(self, cell) -> List[int]:
+        # all the neighbours of cell, skipping empty slots
+        return [
+            neighbour for neighbour in self.neighbours[self.offsets[cell]:self.offsets[cell + 1]]
+            if neighbour != NO_NEIGHBOUR
+        ]
+
+    def slot_of(self, cell, neighbour) -> Optional[int]:
+        # slot of neighbour among the neighbours of cell, None if they are not neighbours
+        start = self.offsets[cell]
+        for idx in range(start, self.offsets[cell + 1]):
+            if self.neighbours[idx] == neighbour:
+                return idx - start
+        return None
+
+    def back_slot(self, cell, slot) -> int:
+        # slot of cell among the neighbours of its neighbour in given slot
+        if self.opposite is not None:
+            return self.opposite[slot]
+        return self.back_slots[self.offsets[cell] + slot]
+
+    def edges(self):
+        # every edge of the graph exactly once, as (cell, neighbour) where cell < neighbour
+        for cell in range(self.num_cells):
+            for idx in range(self.offsets[cell], self.offsets[cell + 1]):
+                neighbour = self.neighbours[idx]
+                if neighbour > cell:
+                    yield cell, neighbour
+
+
+class MazeGraph:
+
+    def __init__(self, topology: MazeTopology):
+        self.topology = topology
+
+        # one bit per slot of every cell. 1 means there's a passage (no wall) between
+        # the cell and its neighbour in that slot
+        if topology.max_degree <= 8:
+            self.passages = bytearray(topology.num_cells)
+        else:
+            self.passages = array('H', bytes(2 * topology.num_cells))
+
+    def __len__(self):
+        return self.topology.num_cells
+
+    def __getitem__(self, cell) -> List[int]:
+        # connections of cell in the old adjacency list format, e.g. [0, 1, 0, 1]
+        mask = self.passages[cell]
+        return [(mask >> slot) & 1 for slot in range(self.topology.degree(cell))]
+
+    def connect(self, cell, slot) -> int:
+        # opens the passage between cell and its neighbour in given slot, on both sides
+        # returns the neighbour
+        neighbour = self.topology.neighbour(cell, slot)
+        self.passages[cell] |= 1 << slot
+        self.passages[neighbour] |= 1 << self.topology.back_slot(cell, slot)
+        return neighbour
+
+    def connect_cells(self, cell1, cell2):
+        slot = self.topology.slot_of(cell1, cell2)
+        if slot is None:
+            raise Exception(f'Cells {cell1} and {cell2} are not neighbours')
+        self.connect(cell1, slot)
+
+    def is_connected(self, cell, slot) -> bool:
+        return (self.passages[cell] >> slot) & 1 == 1
+
+    def are_connected(self, cell1, cell2) -> bool:
+        slot = self.topology.slot_of(cell1, cell2)
+        return slot is not None and self.is_connected(cell1, slot)
+
+    def connected_neighbours(self, cell) -> List[int]:
+        mask = self.passages[cell]
+        return [
+            self.topology.neighbour(cell, slot) for slot in range(self.topology.degree(cell))
+            if (mask >> slot) & 1
+        ]
+
+    def edges(self):
+        # every passage exactly once, as (cell, neighbour) where cell < neighbour
+        for cell in range(self.topology.num_cells):
+            for neighbour in self.connected_neighbours(cell):
+                if neighbour > cell:
+                    yield cell, neighbour
+
+    def num_edges(self) -> int:
+        return sum(bin(mask).count('1') for mask in self.passages) // 2
+
+    def is_spanning_tree(self) -> bool:
+        # a spanning tree of n cells has exactly n-1 edges and reaches every cell
+        num_cells = self.topology.num_cells
+        if num_cells == 0:
+            return True
+        if self.num_edges() != num_cells - 1:
+            return False
+
+        reached = bytearray(num_cells)
+        reached[0] = 1
+        num_reached = 1
+        stack = [0]
+        while stack:
+            cell = stack.pop()
+            for neighbour in self.connected_neighbours(cell):
+                if not reached[neighbour]:
+                    reached[neighbour] = 1
+                    num_reached += 1
+                    stack.append(neighbour)
+
+        return num_reached == num_cells
+
+    def to_adjacency_list(self) -> List[List[int]]:
+        return [self[cell] for cell in range(self.topology.num_cells)]
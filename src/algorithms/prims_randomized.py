@@ -1,5 +1,11 @@
 import pprint
-import random
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
 
 
 class PrimsRandomized:
@@ -20,16 +26,32 @@ class PrimsRandomized:
         self.BOTTOM = 2
         self.RIGHT = 3
 
-    def prims_mst(self):
+        self.topology = self.create_topology()
+
+    def create_topology(self):
+        # square grid graph, each node has a slot for TOP, LEFT, BOTTOM, RIGHT neighbours
+        neighbours = []
+
+        for node in range(self.total_nodes):
+            row = node // self.row_len
+            col = node % self.row_len
+
+            neighbours.append(node - self.row_len if row > 0 else NO_NEIGHBOUR)
+            neighbours.append(node - 1 if col > 0 else NO_NEIGHBOUR)
+            neighbours.append(node + self.row_len if row < self.row_len - 1 else NO_NEIGHBOUR)
+            neighbours.append(node + 1 if col < self.row_len - 1 else NO_NEIGHBOUR)
+
+        # TOP <-> BOTTOM, LEFT <-> RIGHT
+        return MazeTopology.fixed_degree(neighbours, 4, opposite=(self.BOTTOM, self.RIGHT, self.TOP, self.LEFT))
+
+    def prims_mst(self, rng=None):
         # creates Minimum Spanning Tree using Randomized Prim's
+        rng = make_rng(rng)
 
         # the minimum spanning tree has no edges in the start
-        # and it is represented like an adjacency list
         # each node can be connected to 4 of its neighbours, counted counter-clockwise
         # TOP, LEFT, BOTTOM, RIGHT
-        mst = [
-            [0, 0, 0, 0] for _ in range(self.total_nodes)
-        ]
+        mst = MazeGraph(self.topology)
 
         # list of nodes to visit
         to_visit = [node for node in range(self.total_nodes)]
@@ -45,16 +67,12 @@ class PrimsRandomized:
 
             edges_pool = self.edges_to_unvisited_nodes(visited)
             # pick a random edge
-            edge = random.choice(edges_pool)
+            edge = rng.choice(edges_pool)
             node, next_node = edge
 
-            # connect these two nodes in the minimum spanning tree
+            # connect these two nodes in the minimum spanning tree (in both directions)
             direction = self.get_neighbour_dir(node, next_node)
-            mst[node][direction] = 1
-
-            # also set it for the neighbour
-            neighbour_dir = self.get_neighbour_dir(next_node, node)
-            mst[next_node][neighbour_dir] = 1
+            mst.connect(node, direction)
 
             # now remove this next_node from unvisited list and add to visited
             visited.append(next_node)
@@ -62,6 +80,67 @@ class PrimsRandomized:
 
         return mst
 
+    def prims_mst_frontier(self, rng=None):
+        # creates Minimum Spanning Tree using Randomized Prim's, same as prims_mst
+        # but instead of rebuilding the pool of edges on every step, it keeps a
+        # frontier of edges going out of the visited nodes and grows it incrementally.
+        # runs in O(E) instead of O(V^3), so grids of 1000x1000 are built in seconds
+        rng = make_rng(rng)
+
+        mst = MazeGraph(self.topology)
+
+        # visited[node] is 1 if node is already part of the spanning tree
+        visited = bytearray(self.total_nodes)
+
+        # each frontier entry is an edge packed into a single int: node * 4 + direction
+        # which is also its index in topology.neighbours.
+        # the node lies in visited, its neighbour in that direction may or may not
+        frontier = []
+        neighbours = self.topology.neighbours
+
+        # let's start Prims by visiting the first node
+        node = 0
+        visited[node] = 1
+        self.add_frontier_edges(node, frontier)
+
+        nodes_remaining = self.total_nodes - 1
+
+        while nodes_remaining > 0:
+            # pick a random edge from the frontier and remove it by swapping in the last one.
+            # the frontier also has stale edges (neighbour got visited after the edge was added)
+            # those are discarded and we pick again. picking uniformly from all edges and
+            # discarding the stale ones is the same as picking uniformly from the valid edges
+            # like prims_mst does
+            edge_idx = rng.randrange(len(frontier))
+            edge = frontier[edge_idx]
+            frontier[edge_idx] = frontier[-1]
+            frontier.pop()
+
+            next_node = neighbours[edge]
+
+            if visited[next_node]:
+                continue
+
+            # connect these two nodes in the minimum spanning tree (in both directions)
+            node, direction = divmod(edge, 4)
+            mst.connect(node, direction)
+
+            visited[next_node] = 1
+            nodes_remaining -= 1
+
+            self.add_frontier_edges(next_node, frontier)
+
+        return mst
+
+    def add_frontier_edges(self, node, frontier):
+        # adds all the edges of node to the frontier (packed as node * 4 + direction)
+        # edges to already visited nodes are filtered out lazily when they are picked
+        neighbours = self.topology.neighbours
+
+        for edge in range(node * 4, node * 4 + 4):
+            if neighbours[edge] != NO_NEIGHBOUR:
+                frontier.append(edge)
+
     def edges_to_unvisited_nodes(self, visited):
         # returns all the edges originating from already visited nodes and going
         # towards unvisited nodes
@@ -124,5 +203,5 @@ if __name__ == '__main__':
 
     print("Prims Minimum Spanning Tree (as adjacency list):")
     pprint.pp(
-        pr.prims_mst()
+        pr.prims_mst().to_adjacency_list()
     )
@@ -0,0 +1,47 @@
+'''
+Random number generators for the maze algorithms
+
+Every algorithm takes an optional rng. It can be
+* None: use the global random module, as before
+* an int or str seed: the same seed always creates the same maze
+* a random.Random instance: e.g. to draw many mazes from one stream
+'''
+
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def make_rng(rng=None):
+    # returns an object with the random module's methods (choice, randrange, shuffle, ...)
+    if rng is None:
+        return random
+    if isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+
+def make_numpy_rng(seed=None, stream=0):
+    '''
+    NumPy generator for the vectorized algorithms. It uses Philox which is counter based:
+    stream i starts i * 2^128 numbers ahead in the same sequence, jumping there is O(1).
+    So independent streams for parallel workers are just (seed, worker number)
+    '''
+    if np is None:
+        raise Exception("NumPy is required for this algorithm (pip install numpy)")
+
+    if isinstance(seed, np.random.Generator):
+        return seed
+
+    if isinstance(seed, str):
+        # same as random.Random, a str seed is turned into a number deterministically
+        seed = random.Random(seed).getrandbits(128)
+
+    bit_generator = np.random.Philox(seed)
+    if stream > 0:
+        bit_generator = bit_generator.jumped(stream)
+
+    return np.random.Generator(bit_generator)
@@ -4,15 +4,26 @@ THIS CODE IS NOT OPTIMIZED
 
 import math
 import pprint
-import random
-from collections import deque
-from turtle import *
+from array import array
+try:
+    from turtle import *
+except ImportError:
+    # no Tk on this machine, mazes can still be drawn with maze_renderer
+    pass
 from typing import Tuple
 
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.level_layout import TriangularLayout
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
+
 
 class TriangularMaze:
 
-    def __init__(self, sideLen, numLevels):
+    def __init__(self, sideLen, numLevels, rng=None):
         self.sideLen = sideLen
         self.numLevels = numLevels
 
@@ -36,11 +47,16 @@ class TriangularMaze:
         self.numCellsAtLevel = [2 * level + 1 for level in range(self.numLevels)]
         self.totalCellsInMaze = sum(self.numCellsAtLevel)
 
+        # converts between 1D & 2D indices
+        self.layout = TriangularLayout(self.numLevels)
+
         # compute the length of perpendicular dividing the equilateral triangle into
         # 2 right angled triangles.
         self.triangleHeight = self._compute_triangle_height(self.sideLen)
 
-        self.graph = self.computeMaze()
+        self.topology = self.createTopology()
+
+        self.graph = self.computeMaze(rng)
 
 
     def _compute_triangle_height(self, side):
@@ -52,32 +68,11 @@ class TriangularMaze:
 
     def index1dfrom2d(self, level, cell):
         # takes the level & cell (the 2D indices) and converts them to their corresponding 1D index
-        if level >= self.numLevels:
-            raise Exception("level greather than maze levels")
-            return
-
-        idx = 0
-        for l in range(level):
-            idx += self.numCellsAtLevel[l]
-        idx += cell
-
-        return idx
+        return self.layout.index_1d(level, cell)
 
     def index2dfrom1d(self, idx) -> Tuple[int, int]:
         # takes index of cell in 1-D array form and converts to 2D
-        if idx >= self.totalCellsInMaze:
-            raise Exception("1D index greater than total number of cells")
-            return
-
-        level = 0
-        while idx - self.numCellsAtLevel[level] >= 0:
-            idx -= self.numCellsAtLevel[level]
-            level += 1
-
-        # the remaining cells give the index of cell at current level
-        cell = idx
-
-        return level, cell
+        return self.layout.index_2d(idx)
 
     def parent_idx_1d(self, level, cell):
         # takes 2D coordinates of current cell/triangle and returns parent's index in 1d representation
@@ -103,90 +98,80 @@ class TriangularMaze:
         return self.index1dfrom2d(level+1, cell+1)
 
 
-    def computeMaze(self):
+    def createTopology(self):
+        # each cell has a slot for PARENT, LEFT, CHILD, RIGHT neighbours
+        neighbours = []
+
+        for cell_1d in range(self.totalCellsInMaze):
+            level, cell = self.index2dfrom1d(cell_1d)
+
+            for conn in [
+                self.parent_idx_1d(level, cell),
+                self.left_idx_1d(level, cell),
+                self.child_idx_1d(level, cell),
+                self.right_idx_1d(level, cell)
+            ]:
+                neighbours.append(NO_NEIGHBOUR if conn is None else conn)
+
+        # PARENT <-> CHILD, LEFT <-> RIGHT
+        return MazeTopology.fixed_degree(neighbours, 4, opposite=(self.CHILD, self.RIGHT, self.PARENT, self.LEFT))
+
+    def computeMaze(self, rng=None):
         # DFS randomized
+        rng = make_rng(rng)
 
-        # hashmap with each entry corresponding to the connectiong between cells
-        # format of key: "smaller_id_cell:larger_id_cell"
-        graph = {}
+        # spanning tree with a bit for each of PARENT, LEFT, CHILD, RIGHT connections of every cell
+        graph = MazeGraph(self.topology)
 
         # pick a random starting cell
-        cell_1d = random.randint(0, self.totalCellsInMaze - 1)
+        cell_1d = rng.randint(0, self.totalCellsInMaze - 1)
 
-        visited = [cell_1d]
-        stack = deque()
-        stack.append(cell_1d)
+        # visited[cell] is 1 once the cell is part of the spanning tree
+        visited = bytearray(self.totalCellsInMaze)
+        visited[cell_1d] = 1
+        numVisited = 1
 
-        while len(visited) < self.totalCellsInMaze:
-            # randomly pick a neighbour of current cell and go there
+        # a cell is pushed on the stack only once, so it never holds more than all the cells
+        stack = array('i', bytes(4 * self.totalCellsInMaze))
+        stack[0] = cell_1d
+        stackSize = 1
 
-            # get 2D representation of current cell
-            level, cell = self.index2dfrom1d(cell_1d)
+        # neighbours[4 * cell + direction] is the neighbour of cell in that direction
+        neighbours = self.topology.neighbours
 
-            connections = [
-                self.parent_idx_1d(level, cell),
-                self.left_idx_1d(level, cell),
-                self.child_idx_1d(level, cell),
-                self.right_idx_1d(level, cell)
-            ]
+        while numVisited < self.totalCellsInMaze:
+            # randomly pick a neighbour of current cell and go there
 
-            validConnections = []
-            for conn in connections:
-                if conn is not None and conn not in visited:
-                    validConnections.append(conn)
+            validDirections = []
+            for direction in range(4):
+                conn = neighbours[4 * cell_1d + direction]
+                if conn != NO_NEIGHBOUR and not visited[conn]:
+                    validDirections.append(direction)
 
-            if len(validConnections) > 0:
-                nextCell = random.choice(validConnections)
+            if len(validDirections) > 0:
+                direction = rng.choice(validDirections)
 
-                visited.append(nextCell)
-                stack.append(nextCell)
+                # add this connection to the graph (for both cells)
+                nextCell = graph.connect(cell_1d, direction)
 
-                # add this connection to the graph
-                # the key represents connection from lower indexed cell to higher indexed cell
-                key = self._make_graph_key(cell_1d, nextCell)
-                graph[key] = True
+                visited[nextCell] = 1
+                numVisited += 1
+
+                stack[stackSize] = nextCell
+                stackSize += 1
 
                 cell_1d = nextCell
             else:
-                cell_1d = stack.pop()
+                # pop from stack
+                stackSize -= 1
+                cell_1d = stack[stackSize]
 
         return graph
 
-    def _make_graph_key(self, cell1, cell2):
-        # the key of graph hashmap is from smaller indexed cell to higher indexed cell
-        key = f'{cell1}:{cell2}'
-        if cell2 < cell1:
-            key = f'{cell2}:{cell1}'
-        return key
-
     def is_connected_to(self, level, cell, direction):
+        # directions without a neighbour are never connected
         cell_1d = self.index1dfrom2d(level, cell)
-
-        get_conn_id = {
-            self.PARENT: self.parent_idx_1d,
-            self.LEFT: self.left_idx_1d,
-            self.CHILD: self.child_idx_1d,
-            self.RIGHT: self.right_idx_1d
-        }
-
-        conn_id = get_conn_id[direction](level, cell)
-
-        # if direction == self.PARENT:
-        #     conn_id = self.parent_idx_1d(level, cell)
-        # elif direction == self.LEFT:
-        #     conn_id = self.left_idx_1d(level, cell)
-        # elif direction == self.CHILD:
-        #     conn_id = self.child_idx_1d(level, cell)
-        # elif direction == self.RIGHT:
-        #     conn_id = self.right_idx_1d(level, cell)
-        # else:
-        #     raise Exception("Invalid direction provided")
-
-        if conn_id is None:
-            return False
-
-        key = self._make_graph_key(cell_1d, conn_id)
-        return key in self.graph
+        return self.graph.is_connected(cell_1d, direction)
 
     def draw_triangular_maze(self):
 
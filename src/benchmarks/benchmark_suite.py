@@ -0,0 +1,291 @@
+'''
+Benchmark suite for the maze generators, renderers & the dataset pipeline
+
+Every case is run at a few sizes. For each one it records the best time of a few runs,
+the peak memory allocated while running it (tracemalloc, in a separate run since tracing
+slows everything down) and the number of maze cells handled per second.
+
+Results are written as JSON with -output. Given a -baseline (results of an earlier run,
+on the same machine) it fails if a case got slower or uses more memory than allowed:
+
+    $ python benchmark_suite.py -output baseline.json
+    ... change something ...
+    $ python benchmark_suite.py -baseline baseline.json
+
+baseline.json in this folder is a run on the machine the suite was written on, times
+are only comparable on the same machine, so create your own before comparing.
+'''
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../algorithms")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../datasets")
+
+from algorithms.prims_randomized import PrimsRandomized
+from algorithms.loop_erased_random_walk import LoopErasedRandomWalk
+from algorithms.ellers_rectangular import EllersRectangular
+from hexagonal import HexagonalMaze
+from circular import CircularMaze
+from maze_renderer import render_maze
+from datasets.rectangular_kruskal_maze import KruskalRectangular, RectangularKruskalMaze
+from datasets.maze_png import save_maze_png
+from generate_rect_dataset import RectangularDataset
+from dfs_benchmark import hexagonal, circular, triangular
+
+
+VERSION = 1
+
+# fast cases are run till they took this many seconds in total (but at most MAX_RUNS times)
+MIN_TOTAL_TIME = 0.5
+MAX_RUNS = 100
+
+# differences in peak memory smaller than this are never regressions, a few KB more
+# of a case that only needs a few KB is noise
+MIN_MEMORY_GROWTH = 64 * 1024
+
+
+# every case takes a size and returns the function to time & the number of cells it handles.
+# everything that isn't part of what is measured (e.g. the topology) is created before
+
+def prims_mst(n):
+    return PrimsRandomized(n).prims_mst, n * n
+
+
+def prims_mst_frontier(n):
+    return PrimsRandomized(n).prims_mst_frontier, n * n
+
+
+def kruskal_rectangular(n):
+    algo = KruskalRectangular(n)
+    return lambda: algo.kruskal_spanning_tree(rng=1), n * n
+
+
+def kruskal_batched(n):
+    # 1000 mazes at once
+    algo = KruskalRectangular(n)
+    return lambda: algo.kruskal_spanning_trees(1000, seed=1), 1000 * n * n
+
+
+def dfs_case(create_maze):
+    # the generators of dfs_benchmark
+    def create_case(num_levels):
+        generate = create_maze(num_levels)
+        return generate, len(generate())
+
+    return create_case
+
+
+def wilson(n):
+    algo = LoopErasedRandomWalk(PrimsRandomized(n).topology)
+    return lambda: algo.spanning_tree(rng=1), n * n
+
+
+def ellers(n):
+    algo = EllersRectangular(n)
+
+    def generate():
+        for _ in algo.rows(n, rng=1):
+            pass
+
+    return generate, n * n
+
+
+def create_maze_image(n):
+    generator = RectangularKruskalMaze(n, 10)
+    return lambda: generator.create_maze_image(rng=1), n * n
+
+
+def render_hexagonal(num_levels):
+    maze = HexagonalMaze(10, num_levels)
+    spanning_tree = maze.create_dfs_tree(rng=1)
+    return lambda: render_maze(maze, spanning_tree), len(spanning_tree)
+
+
+def render_circular(num_levels):
+    maze = CircularMaze(num_levels, 10)
+    spanning_tree = maze.create_dfs_tree(rng=1)
+    return lambda: render_maze(maze, spanning_tree, rng=1), len(spanning_tree)
+
+
+def save_png(n):
+    # streaming PNG writer, the rows of the maze are created before
+    rows = list(EllersRectangular(n).rows(n, rng=1))
+    file_name = os.path.join(tempfile.gettempdir(), 'benchmark_maze.png')
+    return lambda: save_maze_png(iter(rows), n, n, file_name, 4), n * n
+
+
+def dataset_case(output_format):
+    # 10 x 10 mazes, size is the number of mazes. the dataset is created in a temporary folder
+    def create_case(num_mazes):
+        def generate():
+            with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+                dataset = RectangularDataset(10, 10, num_mazes, False, seed=1, output_format=output_format)
+
+                # a new dataset is always created in the current folder
+                cwd = os.getcwd()
+                os.chdir(directory)
+                try:
+                    dataset.create_dataset()
+                finally:
+                    os.chdir(cwd)
+
+        return generate, num_mazes * 10 * 10
+
+    return create_case
+
+
+# name: (create case, sizes)
+CASES = {
+    'prims_mst': (prims_mst, [10, 20]),
+    'prims_mst_frontier': (prims_mst_frontier, [100, 300]),
+    'kruskal_rectangular': (kruskal_rectangular, [100, 300]),
+    'kruskal_batched': (kruskal_batched, [10, 30]),
+    'hexagonal_dfs': (dfs_case(hexagonal), [50, 150]),
+    'circular_dfs': (dfs_case(circular), [50, 150]),
+    'triangular_dfs': (dfs_case(triangular), [100, 300]),
+    'wilson': (wilson, [100, 300]),
+    'ellers': (ellers, [100, 300]),
+    'create_maze_image': (create_maze_image, [10, 50]),
+    'render_hexagonal': (render_hexagonal, [20, 50]),
+    'render_circular': (render_circular, [20, 100]),
+    'save_maze_png': (save_png, [100, 300]),
+    'dataset_png': (dataset_case('png'), [100, 500]),
+    'dataset_npy': (dataset_case('npy'), [100, 500]),
+}
+
+
+def run_case(create_case, size, repeat):
+    generate, num_cells = create_case(size)
+
+    # like timeit: fast cases are run more times (for at least MIN_TOTAL_TIME) without
+    # garbage collection in between, so their best time isn't just noise
+    best_time = None
+    total_time = 0
+    num_runs = 0
+
+    gc.disable()
+    try:
+        while num_runs < repeat or (total_time < MIN_TOTAL_TIME and num_runs < MAX_RUNS):
+            start_time = time.perf_counter()
+            generate()
+            time_taken = time.perf_counter() - start_time
+
+            best_time = time_taken if best_time is None else min(best_time, time_taken)
+            total_time += time_taken
+            num_runs += 1
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    generate()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cells': num_cells,
+        'seconds': best_time,
+        'peak_bytes': peak_bytes,
+        'cells_per_sec': num_cells / best_time,
+    }
+
+
+def compare(results, baseline, max_slowdown, max_memory_growth):
+    # prints how every case changed since the baseline, returns the cases that regressed
+    regressions = []
+
+    print()
+    print(f'{"case":>26} {"seconds":>10} {"baseline":>10} {"time":>8} {"peak MB":>10} {"baseline":>10} {"memory":>8}')
+
+    for key, result in results.items():
+        if key not in baseline:
+            print(f'{key:>26} {result["seconds"]:>10.4f} {"new":>10}')
+            continue
+
+        base = baseline[key]
+        time_ratio = result['seconds'] / base['seconds']
+        memory_ratio = result['peak_bytes'] / max(1, base['peak_bytes'])
+
+        flags = ''
+        if time_ratio > max_slowdown:
+            flags += ' SLOWER'
+        if memory_ratio > max_memory_growth and result['peak_bytes'] - base['peak_bytes'] > MIN_MEMORY_GROWTH:
+            flags += ' MORE MEMORY'
+        if flags:
+            regressions.append(key)
+
+        print(f'{key:>26} {result["seconds"]:>10.4f} {base["seconds"]:>10.4f} {time_ratio:>7.2f}x '
+              f'{result["peak_bytes"] / 2**20:>10.2f} {base["peak_bytes"] / 2**20:>10.2f} {memory_ratio:>7.2f}x{flags}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-cases', help=f'Comma separated cases to run (all by default): {",".join(CASES)}')
+    parser.add_argument('-quick', action=argparse.BooleanOptionalAction, help='Only run the smallest size of every case')
+    parser.add_argument('-repeat', default=3, help='Number of runs per case & size (best one is kept)')
+    parser.add_argument('-output', help='Path of JSON file to save the results to')
+    parser.add_argument('-baseline', help='JSON file of an earlier run to compare with')
+    parser.add_argument('-max_slowdown', default=2.0,
+                        help='Fail if a case takes this many times the time of the baseline')
+    parser.add_argument('-max_memory_growth', default=1.2,
+                        help='Fail if a case uses this many times the memory of the baseline')
+
+    args = parser.parse_args()
+
+    case_names = args.cases.split(',') if args.cases else list(CASES)
+    for name in case_names:
+        if name not in CASES:
+            raise Exception(f'Unknown case {name}, expected one of {list(CASES)}')
+
+    repeat = int(args.repeat)
+
+    results = {}
+
+    print(f'{"case":>26} {"cells":>10} {"seconds":>10} {"peak MB":>10} {"cells/sec":>12}')
+
+    for name in case_names:
+        create_case, sizes = CASES[name]
+
+        for size in sizes[:1] if args.quick else sizes:
+            result = run_case(create_case, size, repeat)
+            result.update(case=name, size=size)
+
+            key = f'{name}:{size}'
+            results[key] = result
+
+            print(f'{key:>26} {result["cells"]:>10} {result["seconds"]:>10.4f} '
+                  f'{result["peak_bytes"] / 2**20:>10.2f} {result["cells_per_sec"]:>12.0f}')
+
+    if args.output is not None:
+        report = {
+            'version': VERSION,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare(results, baseline['results'], float(args.max_slowdown), float(args.max_memory_growth))
+
+        if regressions:
+            print(f'FAILED: {len(regressions)} case(s) regressed since the baseline: {", ".join(regressions)}')
+            exit(1)
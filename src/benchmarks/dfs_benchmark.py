@@ -0,0 +1,85 @@
+'''
+Regression benchmark for the DFS maze generators (hexagonal, circular & triangular)
+
+Each generator is timed at a size and at double the number of levels (about 4 times
+the cells). They run in linear time, so time per cell should stay about the same.
+If it grows with the size of the maze (e.g. visited turned back into a list
+scanned on every step) the benchmark fails.
+'''
+import argparse
+import time
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../algorithms")
+
+from hexagonal import HexagonalMaze
+from circular import CircularMaze
+from triangular_using_dfs import TriangularMaze
+
+
+def time_per_cell(create_maze, num_levels, repeat):
+    # builds the maze (and its topology) once, then keeps the best time of generating the spanning tree
+    generate = create_maze(num_levels)
+
+    best_time = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        spanning_tree = generate()
+        time_taken = time.perf_counter() - start_time
+
+        best_time = time_taken if best_time is None else min(best_time, time_taken)
+
+    assert spanning_tree.is_spanning_tree()
+
+    return len(spanning_tree), best_time / len(spanning_tree)
+
+
+def hexagonal(num_levels):
+    maze = HexagonalMaze(side_len=10, num_levels=num_levels)
+    return maze.create_dfs_tree
+
+
+def circular(num_levels):
+    maze = CircularMaze(num_levels, 10)
+    return maze.create_dfs_tree
+
+
+def triangular(num_levels):
+    maze = TriangularMaze(10, num_levels)
+    return maze.computeMaze
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-levels', default=150, help='Number of levels of the smaller mazes')
+    parser.add_argument('-repeat', default=3, help='Number of runs per maze (best one is kept)')
+    parser.add_argument('-max_slowdown', default=2.0,
+                        help='Fail if time per cell of the bigger maze is this many times of the smaller one')
+
+    args = parser.parse_args()
+
+    num_levels = int(args.levels)
+    repeat = int(args.repeat)
+    max_slowdown = float(args.max_slowdown)
+
+    failed = False
+
+    print(f'{"maze":>12} {"cells":>10} {"us/cell":>10} {"cells":>10} {"us/cell":>10} {"slowdown":>10}')
+
+    for name, create_maze in [('hexagonal', hexagonal), ('circular', circular), ('triangular', triangular)]:
+        small_cells, small_time = time_per_cell(create_maze, num_levels, repeat)
+        big_cells, big_time = time_per_cell(create_maze, 2 * num_levels, repeat)
+
+        slowdown = big_time / small_time
+        if slowdown > max_slowdown:
+            failed = True
+
+        print(f'{name:>12} {small_cells:>10} {small_time * 1e6:>10.2f} {big_cells:>10} {big_time * 1e6:>10.2f} '
+              f'{slowdown:>9.2f}x')
+
+    if failed:
+        print(f'FAILED: time per cell grew more than {max_slowdown}x with the size of the maze')
+        exit(1)
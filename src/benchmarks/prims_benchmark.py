@@ -0,0 +1,46 @@
+'''
+Compares the original Randomized Prim's (prims_mst) with the
+frontier based one (prims_mst_frontier) at several grid sizes
+'''
+import argparse
+import time
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.prims_randomized import PrimsRandomized
+
+
+def time_it(func):
+    start_time = time.perf_counter()
+    func()
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-sizes', default='10,20,30,200,1000', help='Comma separated row lengths of the grids')
+    parser.add_argument('-max_original', default=30,
+                        help='Largest row length to run the original prims_mst for (it is very slow)')
+
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    max_original = int(args.max_original)
+
+    print(f'{"grid":>12} {"prims_mst":>12} {"frontier":>12} {"speedup":>10}')
+
+    for n in sizes:
+        pr = PrimsRandomized(n)
+
+        frontier_time = time_it(pr.prims_mst_frontier)
+
+        assert pr.prims_mst_frontier().is_spanning_tree()
+
+        if n <= max_original:
+            original_time = time_it(pr.prims_mst)
+            print(f'{f"{n}x{n}":>12} {original_time:>11.4f}s {frontier_time:>11.4f}s {original_time / frontier_time:>9.1f}x')
+        else:
+            print(f'{f"{n}x{n}":>12} {"-":>12} {frontier_time:>11.4f}s {"-":>10}')
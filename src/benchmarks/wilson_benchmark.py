@@ -0,0 +1,95 @@
+'''
+Benchmark of Wilson's algorithm (LoopErasedRandomWalk) against the generators the shapes use
+
+For every shape the same topology is given to Wilson's and to the shape's own generator
+(Kruskal's for rectangular, DFS for the others), the best time per cell is printed along with
+the share of dead ends, which shows how biased the mazes of a generator are.
+
+Wilson's random walks wander around before they hit the tree, so it does more work per cell than
+Kruskal's or DFS, and the first walks take longer the bigger the maze is. In exchange every
+spanning tree is equally likely.
+'''
+import argparse
+import time
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../algorithms")
+
+from algorithms.loop_erased_random_walk import LoopErasedRandomWalk
+from hexagonal import HexagonalMaze
+from circular import CircularMaze
+from triangular_using_dfs import TriangularMaze
+from datasets.rectangular_kruskal_maze import KruskalRectangular
+
+
+def best_time(generate, repeat):
+    # best time of generating the spanning tree, and the last spanning tree
+    best = None
+    for seed in range(repeat):
+        start_time = time.perf_counter()
+        spanning_tree = generate(seed)
+        time_taken = time.perf_counter() - start_time
+
+        best = time_taken if best is None else min(best, time_taken)
+
+    assert spanning_tree.is_spanning_tree()
+
+    return best, spanning_tree
+
+
+def dead_ends(spanning_tree):
+    # share of cells with a single passage
+    num_cells = len(spanning_tree)
+    return sum(1 for cell in range(num_cells) if len(spanning_tree.connected_neighbours(cell)) == 1) / num_cells
+
+
+def rectangular(size):
+    algo = KruskalRectangular(size)
+    return 'kruskal', algo.topology, lambda seed: algo.kruskal_spanning_tree(seed)[0]
+
+
+def triangular(size):
+    maze = TriangularMaze(10, size)
+    return 'dfs', maze.topology, lambda seed: maze.computeMaze(seed)
+
+
+def hexagonal(size):
+    maze = HexagonalMaze(side_len=10, num_levels=size)
+    return 'dfs', maze.topology, maze.create_dfs_tree
+
+
+def circular(size):
+    maze = CircularMaze(size, 10)
+    return 'dfs', maze.topology, maze.create_dfs_tree
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-size', default=300, help='Number of cells per row (rectangular) or levels (other shapes)')
+    parser.add_argument('-repeat', default=3, help='Number of runs per generator (best one is kept)')
+
+    args = parser.parse_args()
+
+    size = int(args.size)
+    repeat = int(args.repeat)
+
+    print(f'{"maze":>12} {"cells":>10} {"generator":>10} {"us/cell":>10} {"dead ends":>10} '
+          f'{"wilson":>10} {"dead ends":>10} {"slowdown":>10}')
+
+    for name, create_maze in [('rectangular', rectangular), ('triangular', triangular),
+                              ('hexagonal', hexagonal), ('circular', circular)]:
+        generator, topology, generate = create_maze(size)
+        wilson = LoopErasedRandomWalk(topology)
+
+        generator_time, generator_tree = best_time(generate, repeat)
+        wilson_time, wilson_tree = best_time(wilson.spanning_tree, repeat)
+
+        num_cells = topology.num_cells
+
+        print(f'{name:>12} {num_cells:>10} {generator:>10} {generator_time / num_cells * 1e6:>10.2f} '
+              f'{dead_ends(generator_tree):>10.1%} {wilson_time / num_cells * 1e6:>10.2f} '
+              f'{dead_ends(wilson_tree):>10.1%} {wilson_time / generator_time:>9.2f}x')
@@ -1,8 +1,15 @@
 import math
-import random
-from collections import deque
+from array import array
 from typing import List, Tuple
-from turtle import *
+try:
+    from turtle import *
+except ImportError:
+    # no Tk on this machine, mazes can still be drawn with maze_renderer
+    pass
+
+from algorithms.level_layout import LevelLayout
+from algorithms.maze_graph import MazeGraph, MazeTopology
+from algorithms.random_source import make_rng
 
 
 class CircularMaze:
@@ -17,6 +24,24 @@ class CircularMaze:
 
         self.total_cells = sum(self.num_cells_at_level)
 
+        # converts between 1D & 2D indices
+        self.layout = LevelLayout(self.num_cells_at_level)
+
+        # slots of neighbours of every cell (except center cell which is connected to all of level-1)
+        # children of a cell come after these
+        self.PARENT = 0
+        self.LEFT = 1
+        self.RIGHT = 2
+
+        self.topology = self.create_topology()
+
+        # angle of the arc of a single cell at each level, in degrees
+        self.arc_angles = [360 / num_cells for num_cells in self.num_cells_at_level]
+
+        # unit vectors pointing at the left boundary of every cell of a level, by number of cells
+        # in the level. many levels have the same number of cells, they share these
+        self.boundary_directions = {}
+
     def cell_count_by_level(self) -> List[int]:
         '''
         level: 0,  1,  2,  3,  4,  5,  6,  7,  8,  9...
@@ -32,31 +57,11 @@ class CircularMaze:
 
     def index_1d_from_2d(self, level, cell):
         # takes the level & cell (the 2D indices) and converts them to their corresponding 1D index
-
-        if level >= self.num_levels:
-            raise Exception("level greater than maze levels")
-
-        idx = 0
-        for lvl in range(level):
-            idx += self.num_cells_at_level[lvl]
-        idx += cell
-
-        return idx
+        return self.layout.index_1d(level, cell)
 
     def index_2d_from_1d(self, idx) -> Tuple[int, int]:
         # takes index of cell in 1-D array form and converts to 2D
-        if idx >= self.total_cells:
-            raise Exception("1D index greater than total number of cells")
-
-        level = 0
-        while idx - self.num_cells_at_level[level] >= 0:
-            idx -= self.num_cells_at_level[level]
-            level += 1
-
-        # the remaining cells give the index of cell at current level
-        cell = idx
-
-        return level, cell
+        return self.layout.index_2d(idx)
 
     def parent_index_1d(self, level, cell):
         # takes 2D index of current cell and returns index of its parent in 1D
@@ -97,83 +102,107 @@ class CircularMaze:
 
         return right
 
-    def create_dfs_tree(self):
+    def neighbours_1d(self, level, cell) -> List[int]:
+        # neighbours of a cell in order: parent, left, right, children (1 or 2)
+        # center cell (level-0) is neighbour of all the cells on level-1
 
-        graph = {
-            node: [] for node in range(self.total_cells)
-        }
+        connections = []
 
-        # pick a random starting cell other then the center cell
-        # we want only one path to center
-        cell_1d = random.randint(1, self.total_cells - 1)
+        if level == 0:
+            # level-0 has 16 neighbours i.e. all the cells on level-1.
+            # indexed [1-16] in 1D representation
+            for idx in range(1, self.num_cells_at_level[1] + 1):
+                connections.append(idx)
+        else:
+            # all the cells except level-0 have 3, 4 or 5 neighbours.
+            # cells in the last level (n-1) have no children.
+            # So they have exactly 3 neighbours (parent, left, right).
 
-        visited = [cell_1d]
+            connections.append(self.parent_index_1d(level, cell))
 
-        # stack will help us do depth first search without recursion
-        stack = deque()
-        stack.append(cell_1d)
+            connections.append(self.left_index_1d(level, cell))
 
-        while len(visited) < self.total_cells:
-            level, cell = self.index_2d_from_1d(cell_1d)
+            connections.append(self.right_index_1d(level, cell))
 
-            # neighbours of current cell
-            connections = []
+            # the cells belonging to level-1 to 2nd last level (n-2) can have either 4 or 5 neighbours
+            if level <= self.num_levels - 2:
+                if self.num_cells_at_level[level] < self.num_cells_at_level[level + 1]:
+                    # since num cells at this level is less than num cells at next level
+                    # then cells in this level have 5 neighbours (since 2 children)
 
-            if level == 0:
-                # level-0 has 16 neighbours i.e. all the cells on level-1.
-                # indexed [1-16] in 1D representation
-                for idx in range(1, self.num_cells_at_level[1] + 1):
-                    connections.append(idx)
-            else:
-                # all the cells except level-0 have 3, 4 or 5 neighbours.
-                # cells in the last level (n-1) have no children.
-                # So they have exactly 3 neighbours (parent, left, right).
+                    # left child:
+                    connections.append(self.index_1d_from_2d(level + 1, 2 * cell))
+                    # right child:
+                    connections.append(self.index_1d_from_2d(level + 1, 2 * cell + 1))
+                else:
+                    # otherwise it has one child
+                    connections.append(self.index_1d_from_2d(level + 1, cell))
 
-                connections.append(self.parent_index_1d(level, cell))
+        return connections
 
-                connections.append(self.left_index_1d(level, cell))
+    def create_topology(self):
+        neighbour_lists = []
 
-                connections.append(self.right_index_1d(level, cell))
+        for cell_1d in range(self.total_cells):
+            level, cell = self.index_2d_from_1d(cell_1d)
+            neighbour_lists.append(self.neighbours_1d(level, cell))
 
-                # the cells belonging to level-1 to 2nd last level (n-2) can have either 4 or 5 neighbours
-                if level <= self.num_levels - 2:
-                    if self.num_cells_at_level[level] < self.num_cells_at_level[level + 1]:
-                        # since num cells at this level is less than num cells at next level
-                        # then cells in this level have 5 neighbours (since 2 children)
+        return MazeTopology.from_neighbour_lists(neighbour_lists)
 
-                        # left child:
-                        connections.append(self.index_1d_from_2d(level + 1, 2 * cell))
-                        # right child:
-                        connections.append(self.index_1d_from_2d(level + 1, 2 * cell + 1))
-                    else:
-                        # otherwise it has one child
-                        connections.append(self.index_1d_from_2d(level + 1, cell))
+    def create_dfs_tree(self, rng=None):
+        rng = make_rng(rng)
 
-            # only keep the neighbours that are not already visited
-            unvisited_connections = []
-            for conn in connections:
-                if conn not in visited:
-                    unvisited_connections.append(conn)
+        # a bit for each neighbour of a cell, set if the cell is connected to it
+        graph = MazeGraph(self.topology)
 
-            if len(unvisited_connections) > 0:
-                next_cell = random.choice(unvisited_connections)
+        # pick a random starting cell other then the center cell
+        # we want only one path to center
+        cell_1d = rng.randint(1, self.total_cells - 1)
+
+        # visited[cell] is 1 once the cell is part of the spanning tree
+        visited = bytearray(self.total_cells)
+        visited[cell_1d] = 1
+        num_visited = 1
+
+        # stack will help us do depth first search without recursion
+        # a cell is pushed only once, so it never holds more than total_cells
+        stack = array('i', bytes(4 * self.total_cells))
+        stack[0] = cell_1d
+        stack_size = 1
+
+        offsets = self.topology.offsets
+        neighbours = self.topology.neighbours
+
+        while num_visited < self.total_cells:
+            # only keep the neighbours of current cell that are not already visited
+            # (as slots in the neighbours of current cell)
+            unvisited_slots = []
+            start = offsets[cell_1d]
+            for idx in range(start, offsets[cell_1d + 1]):
+                if not visited[neighbours[idx]]:
+                    unvisited_slots.append(idx - start)
+
+            if len(unvisited_slots) > 0:
+                slot = rng.choice(unvisited_slots)
 
                 # add connection in both directions
-                # cell_1d -> next_cell
-                graph[cell_1d].append(next_cell)
-                # next_cell -> cell_1d
-                graph[next_cell].append(cell_1d)
+                # cell_1d -> next_cell & next_cell -> cell_1d
+                next_cell = graph.connect(cell_1d, slot)
 
-                visited.append(next_cell)
+                visited[next_cell] = 1
+                num_visited += 1
 
                 # if it is a center cell, do not include it in stack, we want to end current path here
                 if next_cell != 0:
-                    stack.append(next_cell)
+                    stack[stack_size] = next_cell
+                    stack_size += 1
                     cell_1d = next_cell
                 else:
-                    cell_1d = stack.pop()
+                    stack_size -= 1
+                    cell_1d = stack[stack_size]
             else:
-                cell_1d = stack.pop()
+                stack_size -= 1
+                cell_1d = stack[stack_size]
 
         return graph
 
@@ -184,7 +213,7 @@ class CircularMaze:
             radius = level * self.line_length
 
             # for this level, the circle would be divided into num_cells number of arcs
-            arcAngle = 360 / self.num_cells_at_level[level]
+            arcAngle = self.arc_angles[level]
 
             goto(radius, 0)
 
@@ -242,7 +271,7 @@ class CircularMaze:
             # draw level 1's bottom arc with bigger radius (that's why level+1)
             radius = level * self.line_length
 
-            arcAngle = 360 / self.num_cells_at_level[level]
+            arcAngle = self.arc_angles[level]
 
             penup()
             goto(radius, 0)
@@ -253,11 +282,8 @@ class CircularMaze:
                 # get 1D index from 2D representation for current cell
                 cell_1d = self.index_1d_from_2d(level, cell)
 
-                parent_cell = self.parent_index_1d(level, cell)
-                left_cell = self.left_index_1d(level, cell)
-
                 # draw vertical line between current cell and its left_cell if they are not connected
-                if left_cell not in graph[cell_1d]:
+                if not graph.is_connected(cell_1d, self.LEFT):
                     pendown()
                     forward(self.line_length)
                     penup()
@@ -267,7 +293,7 @@ class CircularMaze:
 
                 # if current cell & parent are connected, don't draw arc.
                 # but do move the arc length to move the cursor to desired position for next cell
-                if parent_cell not in graph[cell_1d]:
+                if not graph.is_connected(cell_1d, self.PARENT):
                     pendown()
 
                 # turn for the arch
@@ -287,9 +313,9 @@ class CircularMaze:
         pendown()
 
         num_cells = self.num_cells_at_level[-1]
-        arcAngle = 360 / num_cells
+        arcAngle = self.arc_angles[-1]
 
-        skip_arc = random.randint(0, num_cells - 1)
+        skip_arc = self.entrance_cell()
 
         for cell in range(num_cells):
             if cell == skip_arc:
@@ -301,6 +327,67 @@ class CircularMaze:
                 pendown()
 
 
+    def entrance_cell(self, rng=None):
+        # the cell of the last level whose outer arc is left open as the entrance
+        return make_rng(rng).randint(0, self.num_cells_at_level[-1] - 1)
+
+    def cell_boundary_directions(self, level):
+        # (cos, sin) of the angle of the left boundary of every cell of level
+        num_cells = self.num_cells_at_level[level]
+
+        if num_cells not in self.boundary_directions:
+            angle = 2 * math.pi / num_cells
+            self.boundary_directions[num_cells] = [
+                (math.cos(cell * angle), math.sin(cell * angle)) for cell in range(num_cells)
+            ]
+
+        return self.boundary_directions[num_cells]
+
+    def wall_segments(self, graph):
+        # the straight walls drawn by draw_maze (between a cell & its left cell), in turtle coordinates
+        segments = []
+
+        for level in range(1, self.num_levels):
+            inner_radius = level * self.line_length
+            outer_radius = inner_radius + self.line_length
+
+            first_cell = self.index_1d_from_2d(level, 0)
+
+            for cell, (cos, sin) in enumerate(self.cell_boundary_directions(level)):
+                if not graph.is_connected(first_cell + cell, self.LEFT):
+                    segments.append(((inner_radius * cos, inner_radius * sin), (outer_radius * cos, outer_radius * sin)))
+
+        return segments
+
+    def wall_arcs(self, graph, rng=None):
+        '''
+        the walls along circles drawn by draw_maze (between a cell & its parent and the boundary),
+        as (radius, start_angle, end_angle) in degrees. the boundary has an entrance at a random cell
+        '''
+        arcs = []
+
+        for level in range(1, self.num_levels):
+            radius = level * self.line_length
+            arc_angle = self.arc_angles[level]
+
+            first_cell = self.index_1d_from_2d(level, 0)
+
+            for cell in range(self.num_cells_at_level[level]):
+                if not graph.is_connected(first_cell + cell, self.PARENT):
+                    arcs.append((radius, cell * arc_angle, (cell + 1) * arc_angle))
+
+        radius = self.num_levels * self.line_length
+        arc_angle = self.arc_angles[-1]
+
+        skip_arc = self.entrance_cell(rng)
+
+        for cell in range(self.num_cells_at_level[-1]):
+            if cell != skip_arc:
+                arcs.append((radius, cell * arc_angle, (cell + 1) * arc_angle))
+
+        return arcs
+
+
 if __name__ == '__main__':
     pensize(2)
     speed(100)
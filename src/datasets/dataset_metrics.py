@@ -0,0 +1,118 @@
+'''
+Timings & counters of the dataset pipeline, written periodically as JSON lines
+
+Every maze goes through these stages, each one is timed separately:
+* tree: creating the spanning tree (in the workers)
+* rasterize: the grid of the maze and its pixels or array (in the workers)
+* hash: packing the spanning tree as a record and its digest (in the workers)
+* encode: PNG encoding, png format only (in the workers)
+* wait: waiting for the next maze from the workers (main process)
+* dedup: checking the digest for duplicates (main process)
+* write: writing the maze, its spanning tree & seed to disk (main process)
+
+Instead of a line per maze, one line per interval is appended to metrics.jsonl with the
+mazes per second and the p50 / p99 / total time of every stage during the interval, e.g.
+
+{"elapsed": 10.0, "mazes": 52000, "attempts": 52003, "duplicates": 3, "retries": 0,
+ "interval_mazes": 5200, "mazes_per_sec": 520.0,
+ "stages": {"tree": {"count": 5200, "p50_ms": 1.2, "p99_ms": 2.0, "total_sec": 6.4}, ...}}
+
+Times of the worker stages are added up over all the workers, so with several workers their
+totals can be more than the time of the interval.
+'''
+import json
+import time
+
+import numpy as np
+
+
+WORKER_STAGES = ('tree', 'rasterize', 'hash', 'encode')
+MAIN_STAGES = ('wait', 'dedup', 'write')
+STAGES = WORKER_STAGES + MAIN_STAGES
+
+
+class DatasetMetrics:
+
+    def __init__(self, path, interval=10.0, num_mazes=0, num_attempts=0):
+        '''
+        appends to the file at path every interval seconds.
+        num_mazes & num_attempts are the counts so far, when a dataset is resumed
+        '''
+        self.path = path
+        self.interval = interval
+
+        self.num_mazes = num_mazes
+        self.num_attempts = num_attempts
+        self.num_duplicates = num_attempts - num_mazes
+
+        # number of times the mazes still needed had to be created again, because of duplicates
+        self.num_retries = 0
+
+        self.start_time = time.perf_counter()
+        self.interval_start = self.start_time
+        self.interval_mazes = 0
+
+        # durations of every stage during the current interval
+        self.durations = {stage: [] for stage in STAGES}
+
+    def add(self, stage, duration):
+        self.durations[stage].append(duration)
+
+    def add_worker_times(self, stage_times):
+        # durations of WORKER_STAGES for a single maze, as returned by create_maze
+        for stage, duration in zip(WORKER_STAGES, stage_times):
+            if duration is not None:
+                self.durations[stage].append(duration)
+
+    def count_maze(self, is_duplicate):
+        self.num_attempts += 1
+
+        if is_duplicate:
+            self.num_duplicates += 1
+        else:
+            self.num_mazes += 1
+            self.interval_mazes += 1
+
+    def count_retry(self):
+        self.num_retries += 1
+
+    def is_due(self):
+        return time.perf_counter() - self.interval_start >= self.interval
+
+    def flush(self):
+        # appends the metrics of the current interval and starts the next one, returns them
+        now = time.perf_counter()
+        interval_time = now - self.interval_start
+
+        stages = {}
+        for stage, durations in self.durations.items():
+            if len(durations) == 0:
+                continue
+
+            p50, p99 = np.percentile(durations, (50, 99))
+            stages[stage] = {
+                'count': len(durations),
+                'p50_ms': round(p50 * 1000, 4),
+                'p99_ms': round(p99 * 1000, 4),
+                'total_sec': round(sum(durations), 4),
+            }
+
+        metrics = {
+            'elapsed': round(now - self.start_time, 3),
+            'mazes': self.num_mazes,
+            'attempts': self.num_attempts,
+            'duplicates': self.num_duplicates,
+            'retries': self.num_retries,
+            'interval_mazes': self.interval_mazes,
+            'mazes_per_sec': round(self.interval_mazes / interval_time, 2) if interval_time > 0 else None,
+            'stages': stages,
+        }
+
+        with open(self.path, 'a') as metrics_file:
+            metrics_file.write(json.dumps(metrics) + '\n')
+
+        self.interval_start = now
+        self.interval_mazes = 0
+        self.durations = {stage: [] for stage in STAGES}
+
+        return metrics
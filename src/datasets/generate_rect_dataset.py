@@ -1,100 +1,367 @@
 '''
 Dataset that creates Rectangular Mazes
 '''
+import io
+import itertools
+import json
 import math
+import random
 import time
-from sys import argv
-import argparse, sys
+from collections import deque
+from multiprocessing import Pool
+import argparse
+from functools import lru_cache
 
-from hashlib import sha256
 from pathlib import Path
 
+import numpy as np
+
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
 
 from rectangular_kruskal_maze import RectangularKruskalMaze
+from maze_store import MazeStore, MazeStoreWriter, pack_edges, unpack_edges
+from maze_dedup import DigestIndex, maze_digest
+from dataset_metrics import DatasetMetrics
+
+
+# number of tasks given to the workers at a time, per worker. at most two batches are in flight
+# (one being written while the workers create the next one), so memory doesn't grow with the dataset
+BATCH_SIZE_PER_WORKER = 64
+
+
+@lru_cache(maxsize=4)
+def maze_generator(row_len, side_len):
+    # one generator per process & size, building its topology again for every maze took ~15% of the time
+    return RectangularKruskalMaze(row_len, side_len)
+
+
+def create_maze(task):
+    '''
+    creates a single maze, runs in the worker processes (or the main one if there are no workers).
+    task is (row_len, side_len, seed, output_format, packed). the maze only depends on these, not on
+    the process that creates it, so a dataset is the same for any number of workers.
+    returns the spanning tree (packed as a maze store record), its digest, the maze, either as image
+    encoded as PNG or as uint8 grid for the npy format (bit-packed along rows if packed), and the time
+    taken by every stage (see dataset_metrics.WORKER_STAGES, None if the stage was skipped)
+    '''
+    row_len, side_len, seed, output_format, packed = task
+
+    generator = maze_generator(row_len, side_len)
+
+    start_time = time.perf_counter()
+    spanning_tree, edges = generator.create_spanning_tree(rng=seed)
+    tree_time = time.perf_counter()
+
+    grid = generator.create_maze_grid(spanning_tree, generator.algo)
+
+    if output_format == 'npy':
+        maze_data = np.packbits(grid, axis=-1) if packed else grid.astype(np.uint8)
+    else:
+        maze_image = generator.rasterize(grid)
+    rasterize_time = time.perf_counter()
+
+    # one bit per edge of the grid, so the same spanning tree always has the same record.
+    # its digest is used for checking duplicates
+    record = pack_edges(edges, row_len)
+    key = maze_digest(record)
+    hash_time = time.perf_counter()
+
+    encode_duration = None
+    if output_format != 'npy':
+        png_buffer = io.BytesIO()
+        maze_image.save(png_buffer, format='PNG')
+        maze_data = png_buffer.getvalue()
+        encode_duration = time.perf_counter() - hash_time
+
+    stage_times = (tree_time - start_time, rasterize_time - tree_time, hash_time - rasterize_time, encode_duration)
+
+    return record, key, maze_data, stage_times
 
 
 class RectangularDataset:
 
-    def __init__(self, row_len, side_len, num_mazes, verbose_output):
+    def __init__(self, row_len, side_len, num_mazes, verbose_output, num_workers=1, seed=None,
+                 output_format='png', packed=False, checkpoint_interval=10000, metrics_interval=10.0):
         self.n = row_len
         self.side_len = side_len
         self.num_mazes = num_mazes
 
         self.verbose_output = verbose_output
 
-    def create_dataset(self):
+        # number of processes creating mazes in parallel
+        self.num_workers = num_workers
+
+        # every maze gets its own seed derived from this one, pick one at random if not given
+        self.seed = seed if seed is not None else random.randrange(2**32)
+
+        # 'png': one image per maze in images/
+        # 'npy': all the mazes in a single mazes.npy array of shape num_mazes x (2n+1) x (2n+1),
+        # 1 for open boxes & 0 for walls. if packed, every row of a grid is bit-packed (np.packbits)
+        if output_format not in ('png', 'npy'):
+            raise Exception(f'Unknown output format {output_format}')
+        self.output_format = output_format
+        self.packed = packed
+
+        # progress is saved every checkpoint_interval mazes, so an interrupted dataset can be
+        # continued from there, see create_dataset
+        self.checkpoint_interval = checkpoint_interval
+
+        # timings & counters are appended to metrics.jsonl every metrics_interval seconds, see dataset_metrics.py
+        self.metrics_interval = metrics_interval
+
+    def maze_tasks(self, first_attempt, num_attempts):
+        # tasks for create_maze, created as they are needed. every attempt (including the ones
+        # that turn out to be duplicates) has a different but deterministic seed
+        for attempt in range(first_attempt, first_attempt + num_attempts):
+            yield self.n, self.side_len, f'{self.seed}:{attempt}', self.output_format, self.packed
+
+    def maze_results(self, pool, first_attempt, num_attempts):
+        '''
+        yields (task, result of create_maze) for every attempt, in order of attempts. with workers, the
+        tasks are given to them in batches and the next batch only once the one before it is being
+        used up, so the results waiting to be written never exceed two batches
+        '''
+        tasks = self.maze_tasks(first_attempt, num_attempts)
+
+        if pool is None:
+            for task in tasks:
+                yield task, create_maze(task)
+            return
+
+        batch_size = BATCH_SIZE_PER_WORKER * self.num_workers
+        chunk_size = BATCH_SIZE_PER_WORKER // 4
+
+        in_flight = deque()
+        while True:
+            while len(in_flight) < 2:
+                batch = list(itertools.islice(tasks, batch_size))
+                if len(batch) == 0:
+                    break
+                in_flight.append((batch, pool.map_async(create_maze, batch, chunksize=chunk_size)))
+
+            if len(in_flight) == 0:
+                return
+
+            batch, batch_results = in_flight.popleft()
+            yield from zip(batch, batch_results.get())
+
+    @classmethod
+    def from_checkpoint(cls, dataset_directory, verbose_output, num_workers=1, checkpoint_interval=10000,
+                        metrics_interval=10.0):
+        # the dataset whose creation was interrupted, to continue it with create_dataset(dataset_directory)
+        if not os.path.exists(f'{dataset_directory}/checkpoint.json'):
+            raise Exception(f'{dataset_directory} has no checkpoint.json, it is not a dataset folder')
+
+        with open(f'{dataset_directory}/checkpoint.json') as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        return cls(checkpoint['rows'], checkpoint['width'], checkpoint['items'], verbose_output, num_workers,
+                   checkpoint['seed'], checkpoint['format'], checkpoint['packed'], checkpoint_interval,
+                   metrics_interval)
+
+    def save_checkpoint(self, dataset_directory, maze_id, num_attempts, seeds_file_size):
+        '''
+        the state needed to continue creating the dataset: the mazes only depend on the seed & their
+        attempt number, so that's all the random state there is. the files written after the last
+        checkpoint are cut back to it when resuming, and the digests for checking duplicates are
+        created again from the spanning trees kept. the checkpoint is written to a temporary file
+        first and then renamed, so it is never half written
+        '''
+        checkpoint = {
+            'rows': self.n,
+            'width': self.side_len,
+            'items': self.num_mazes,
+            'seed': self.seed,
+            'format': self.output_format,
+            'packed': self.packed,
+            'next_maze_id': maze_id,
+            'next_attempt': num_attempts,
+            'seeds_file_size': seeds_file_size,
+        }
+
+        checkpoint_tmp_name = f'{dataset_directory}/checkpoint.tmp.json'
+        with open(checkpoint_tmp_name, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file, indent=4)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(checkpoint_tmp_name, f'{dataset_directory}/checkpoint.json')
+
+    def create_dataset(self, dataset_directory=None):
+        '''
+        creates the dataset in a new folder. if dataset_directory is given, continues creating the dataset
+        in it from its last checkpoint instead (see from_checkpoint)
+        '''
         start_time = time.time()
 
-        seconds = math.floor(time.time())
-        cwd_path = './'
-        ds_name = f'rectangular_mazes_{seconds}'
+        checkpoint = None
 
-        # create a folder for this dataset in current directory
-        dataset_directory = cwd_path + ds_name
-        dataset_images_dir = f'{dataset_directory}/images/'
-        Path(dataset_directory).mkdir(parents=True)
-        Path(dataset_images_dir).mkdir()
+        if dataset_directory is None:
+            seconds = math.floor(time.time())
+            cwd_path = './'
+            ds_name = f'rectangular_mazes_{seconds}'
 
-        # add logs.txt
-        log_file_name = f'{dataset_directory}/logs.txt'
-        log_file = open(log_file_name, 'a')
-
-        # add spanning_trees.txt to record a spanning tree per line for every maze
-        tree_file_name = f'{dataset_directory}/spanning_tree.txt'
-        tree_file = open(tree_file_name, 'a')
-
-        # a map whose key is a hash of a Maze's spanning tree and value is its maze_id
-        # helpful in checking duplicates
-        maze_hashes = {}
+            # create a folder for this dataset in current directory
+            dataset_directory = cwd_path + ds_name
+            Path(dataset_directory).mkdir(parents=True)
 
-        # 0 <-> n-1
-        maze_id = 0
+            # so the dataset can be resumed even if it is stopped before the first real checkpoint
+            self.save_checkpoint(dataset_directory, 0, 0, 0)
+        else:
+            with open(f'{dataset_directory}/checkpoint.json') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
 
-        mazes_remaining = self.num_mazes
+            # stopped before any maze was saved, its files may not even exist yet. start again
+            if checkpoint['next_maze_id'] == 0:
+                checkpoint = None
 
-        generator = RectangularKruskalMaze(self.n, self.side_len)
-
-        while mazes_remaining > 0:
-            edges, maze_image = generator.create_maze_image()
-
-            spanning_tree_str = str(edges)
-
-            # check if a maze with similar structure was already created
-            # edges follow a convention and are sorted. create a hash and use hash checking
-            # for faster checking for duplicates
-            key = sha256(spanning_tree_str.encode()).hexdigest()
-            value = maze_id
+        dataset_images_dir = f'{dataset_directory}/images/'
 
-            if key in maze_hashes:
-                output_line = f"[info] Duplicate found for Maze#{maze_id} with Maze#{maze_hashes[key]}\n"
-                output_line += f"{spanning_tree_str}\n"
-                output_line += "[info] Generating again\n"
-                log_file.write(output_line)
+        if self.output_format == 'npy':
+            mazes_array = self.create_npy_file(dataset_directory, resume=checkpoint is not None)
+        else:
+            Path(dataset_images_dir).mkdir(exist_ok=True)
 
-                print(output_line)
-                print()
-                continue
+        # add logs.txt
+        log_file_name = f'{dataset_directory}/logs.txt'
+        log_file = open(log_file_name, 'a')
 
-            # else this is a new maze
+        tree_file_name = f'{dataset_directory}/spanning_trees.bin'
+        seeds_file_name = f'{dataset_directory}/seeds.txt'
 
-            # maze will be saved at this path
-            maze_image_path = f'{dataset_images_dir}/{maze_id}.png'
-            maze_image.save(maze_image_path)
+        if checkpoint is None:
+            # 0 <-> n-1
+            maze_id = 0
 
-            if self.verbose_output:
-                # output_line = f'Maze created #{maze_id}, {key}\n' # no need to print hash (key)
-                output_line = f'Maze created #{maze_id}\n'
-                log_file.write(output_line)
-                print(output_line, end='')
+            # number of mazes generated so far, including duplicates
+            num_attempts = 0
 
-            maze_hashes[key] = maze_id
-            tree_file.write(f'{maze_id}: {spanning_tree_str}\n')
+            # add spanning_trees.bin to store the spanning tree of every maze, see maze_store.py
+            # read it with MazeStore(path)[maze_id]
+            tree_file = MazeStoreWriter(tree_file_name, self.n)
+
+            # add seeds.txt to record the seed of every maze. a maze can be created again
+            # from its seed: RectangularKruskalMaze(rows, width).create_maze_image(rng=seed)
+            seeds_file = open(seeds_file_name, 'w')
 
-            maze_id += 1
-            mazes_remaining -= 1
+            # digests of the spanning trees of all the mazes so far, for checking duplicates.
+            # 8 bytes per maze, see maze_dedup.py
+            maze_hashes = DigestIndex()
+        else:
+            maze_id = checkpoint['next_maze_id']
+            num_attempts = checkpoint['next_attempt']
+
+            seeds_file = open(seeds_file_name, 'r+')
+            seeds_file.truncate(checkpoint['seeds_file_size'])
+            seeds_file.seek(0, os.SEEK_END)
+
+            # the digests of the mazes kept, from their spanning trees. 8 bytes per maze
+            with MazeStore(tree_file_name) as tree_store:
+                maze_hashes = DigestIndex.from_records(tree_store.record(idx) for idx in range(maze_id))
+
+            # drop whatever was written after the checkpoint, those mazes are created again
+            tree_file = MazeStoreWriter(tree_file_name, self.n, num_mazes=maze_id)
+
+            output_line = f'[info] Resuming from Maze#{maze_id}\n'
+            log_file.write(output_line)
+            print(output_line, end='')
+
+        mazes_remaining = self.num_mazes - maze_id
+
+        # add metrics.jsonl with the time taken by every stage, appended to when resuming
+        metrics = DatasetMetrics(f'{dataset_directory}/metrics.jsonl', self.metrics_interval, maze_id, num_attempts)
+
+        # workers create & encode the mazes, this process checks for duplicates and assigns
+        # maze ids in order of attempts, so ids are contiguous and the dataset is deterministic
+        pool = Pool(self.num_workers) if self.num_workers > 1 else None
+
+        try:
+            while mazes_remaining > 0:
+                # create as many mazes as still needed. if some are duplicates, loop again for the rest
+                results = self.maze_results(pool, num_attempts, mazes_remaining)
+
+                while True:
+                    stage_start = time.perf_counter()
+                    result = next(results, None)
+                    stage_end = time.perf_counter()
+
+                    if result is None:
+                        break
+                    task, (record, key, maze_data, stage_times) = result
+
+                    # without workers the mazes are created while "waiting", that time is already in stage_times
+                    if pool is not None:
+                        metrics.add('wait', stage_end - stage_start)
+                    metrics.add_worker_times(stage_times)
+
+                    num_attempts += 1
+
+                    # check if a maze with similar structure was already created, add it otherwise
+                    stage_start = stage_end
+                    is_new = maze_hashes.add(key)
+                    stage_end = time.perf_counter()
+                    metrics.add('dedup', stage_end - stage_start)
+
+                    metrics.count_maze(is_duplicate=not is_new)
+
+                    if not is_new:
+                        output_line = f"[info] Duplicate found for Maze#{maze_id}\n"
+                        output_line += f"{unpack_edges(record, self.n)}\n"
+                        output_line += "[info] Generating again\n"
+                        log_file.write(output_line)
+                        continue
+
+                    # else this is a new maze
+                    stage_start = stage_end
+
+                    if self.output_format == 'npy':
+                        mazes_array[maze_id] = maze_data
+                    else:
+                        # maze will be saved at this path
+                        maze_image_path = f'{dataset_images_dir}/{maze_id}.png'
+                        with open(maze_image_path, 'wb') as maze_image_file:
+                            maze_image_file.write(maze_data)
+
+                    tree_file.append(record)
+                    seeds_file.write(f'{maze_id}: {task[2]}\n')
+
+                    metrics.add('write', time.perf_counter() - stage_start)
+
+                    maze_id += 1
+                    mazes_remaining -= 1
+
+                    if maze_id % self.checkpoint_interval == 0 or mazes_remaining == 0:
+                        # everything before the checkpoint must be on disk before the checkpoint itself
+                        tree_file.flush(sync=True)
+                        seeds_file.flush()
+                        os.fsync(seeds_file.fileno())
+                        if self.output_format == 'npy':
+                            # msync, returns once the pages are written
+                            mazes_array.flush()
+                        else:
+                            # the images since the last checkpoint, fsync on every image would be much slower
+                            os.sync()
+
+                        self.save_checkpoint(dataset_directory, maze_id, num_attempts, seeds_file.tell())
+
+                    if metrics.is_due() or mazes_remaining == 0:
+                        interval_metrics = metrics.flush()
+
+                        if self.verbose_output:
+                            output_line = (f'[metrics] {interval_metrics["mazes"]} mazes created, '
+                                           f'{interval_metrics["mazes_per_sec"]} mazes/sec, '
+                                           f'{interval_metrics["duplicates"]} duplicates\n')
+                            log_file.write(output_line)
+                            print(output_line, end='')
+
+                if mazes_remaining > 0:
+                    metrics.count_retry()
+        finally:
+            if pool is not None:
+                # every task is done unless something went wrong, then the workers are stopped right away
+                pool.terminate()
+                pool.join()
 
         output_line = f'\nTime Taken: {time.time() - start_time} seconds'
         log_file.write(output_line)
@@ -102,10 +369,46 @@ class RectangularDataset:
 
         log_file.close()
         tree_file.close()
+        seeds_file.close()
+
+        if self.output_format == 'npy':
+            mazes_array.flush()
+            del mazes_array
 
         # return the directory of dataset
         return Path(dataset_directory).absolute()
 
+    def create_npy_file(self, dataset_directory, resume=False):
+        '''
+        creates mazes.npy, memory-mapped so mazes are written to disk as they are created.
+        loaders can open it with np.load(path, mmap_mode='r') and slice batches without
+        copying or decoding anything. mazes.json describes its layout.
+        if resume, opens the existing mazes.npy to continue writing it
+        '''
+        if resume:
+            return np.load(f'{dataset_directory}/mazes.npy', mmap_mode='r+')
+
+        grid_len = 2 * self.n + 1
+        row_bytes = (grid_len + 7) // 8 if self.packed else grid_len
+        shape = (self.num_mazes, grid_len, row_bytes)
+
+        metadata = {
+            'num_mazes': self.num_mazes,
+            'rows': self.n,
+            'grid_size': grid_len,
+            'shape': shape,
+            'dtype': 'uint8',
+            'packed': self.packed,
+            'seed': self.seed,
+            # in grid coordinates (row, col), see RectangularKruskalMaze.create_maze_grid
+            'entrance': (1, 0),
+            'exit': (2 * self.n - 1, 2 * self.n),
+        }
+        with open(f'{dataset_directory}/mazes.json', 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=4)
+
+        return np.lib.format.open_memmap(f'{dataset_directory}/mazes.npy', mode='w+', dtype=np.uint8, shape=shape)
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
@@ -114,9 +417,28 @@ if __name__ == '__main__':
     parser.add_argument('-width', help='Wall width in pixels')
     parser.add_argument('-items', help='Dataset size (number of images to generate)')
     parser.add_argument("-verbose", action=argparse.BooleanOptionalAction, help="Verbose output")
+    parser.add_argument('-workers', default=1, help='Number of processes creating mazes in parallel')
+    parser.add_argument('-seed', help='Seed to recreate the same dataset (random by default)')
+    parser.add_argument('-format', default='png', choices=['png', 'npy'],
+                        help='Save mazes as png images or in a single memory-mapped npy array')
+    parser.add_argument("-packed", action=argparse.BooleanOptionalAction,
+                        help="Bit-pack the rows of mazes in the npy array")
+    parser.add_argument('-resume', help='Folder of an interrupted dataset to continue creating it')
+    parser.add_argument('-checkpoint', default=10000, help='Number of mazes between saving progress (for -resume)')
+    parser.add_argument('-metrics', default=10, help='Seconds between writing timings & counters to metrics.jsonl')
 
     args = parser.parse_args()
 
+    if args.resume is not None:
+        is_verbose = True if args.verbose else False
+        ds = RectangularDataset.from_checkpoint(args.resume, is_verbose, int(args.workers), int(args.checkpoint),
+                                                float(args.metrics))
+
+        ds_folder = ds.create_dataset(args.resume)
+
+        print(f'Task finished. Created {ds.num_mazes} Mazes {ds_folder}')
+        exit(0)
+
     if args.rows is None or args.width is None or args.items is None:
         print("Please provide all optional arguments:")
         parser.print_help()
@@ -128,10 +450,13 @@ if __name__ == '__main__':
     # number of mazes to generate in the dataset
     num_items = int(args.items)
     is_verbose = True if args.verbose else False
+    num_workers = int(args.workers)
+    seed = int(args.seed) if args.seed is not None else None
 
-    ds = RectangularDataset(num_rows, side_length, num_items, is_verbose)
+    ds = RectangularDataset(num_rows, side_length, num_items, is_verbose, num_workers, seed,
+                            args.format, bool(args.packed), int(args.checkpoint), float(args.metrics))
 
     ds_folder = ds.create_dataset()
 
-    print(f'Task finished. Created {num_items} Maze images {ds_folder}')
+    print(f'Task finished. Created {num_items} Mazes {ds_folder}')
 
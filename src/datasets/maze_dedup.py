@@ -0,0 +1,166 @@
+'''
+Duplicate detection for datasets with a huge number of mazes
+
+Every maze is identified by a 64-bit digest (blake2b) of its maze store record, the
+bitmask of its spanning tree. Digests are kept in sorted NumPy arrays (8 bytes per
+maze) and looked up with binary search. New digests go to a small buffer first, a full
+buffer becomes a new sorted run. Runs are merged like a binary counter: whenever a run
+is at least as big as the one before it, the two become one. So there are at most
+log2(mazes / buffer_size) + 1 runs, and every digest is copied O(log n) times in total,
+instead of the whole array being copied every time the buffer is full.
+
+Two different mazes can have the same digest, at 100M mazes the chance that it happens
+even once is ~0.03%. It is harmless: the second maze is treated as a duplicate and
+another one is created instead.
+'''
+from hashlib import blake2b
+
+import numpy as np
+
+
+def maze_digest(record: bytes) -> int:
+    return int.from_bytes(blake2b(record, digest_size=8).digest(), 'little')
+
+
+class BloomFilter:
+    '''
+    answers "definitely not added" or "maybe added" in O(1), without touching the sorted array.
+    with 10 bits per item (~1.2 bytes) about 1% of the new mazes still need the binary search
+    it is only worth it when the binary search is expensive, e.g. the digests array does not
+    fit in memory. otherwise the hashing costs about as much as the search it saves
+    '''
+
+    def __init__(self, capacity, bits_per_item=10):
+        self.num_bits = max(64, capacity * bits_per_item)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+        # optimal number of hash functions is bits_per_item * ln(2)
+        self.num_hashes = max(1, round(bits_per_item * 0.693))
+
+    def add(self, digest) -> bool:
+        # sets the bits of digest, returns True if they were all set already (maybe added before)
+
+        # the digest is already random, split it into two hashes and combine them
+        # (double hashing) instead of hashing the maze again num_hashes times
+        pos = digest & 0xFFFFFFFF
+        step = (digest >> 32) | 1
+
+        bits = self.bits
+        maybe_added = True
+        for _ in range(self.num_hashes):
+            pos %= self.num_bits
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                maybe_added = False
+            pos += step
+
+        return maybe_added
+
+
+class DigestIndex:
+
+    def __init__(self, buffer_size=1 << 16, bloom_capacity=None):
+        '''
+        buffer_size: number of digests added before they become a sorted run
+        bloom_capacity: expected number of mazes. if given, a bloom filter is checked
+            before the sorted runs
+        '''
+        # sorted arrays of digests, biggest (oldest) first
+        self.runs = []
+
+        self.buffer = set()
+        self.buffer_size = buffer_size
+
+        self.bloom = BloomFilter(bloom_capacity) if bloom_capacity is not None else None
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs) + len(self.buffer)
+
+    def __contains__(self, digest):
+        if digest in self.buffer:
+            return True
+
+        digest = np.uint64(digest)
+        for run in self.runs:
+            idx = run.searchsorted(digest)
+            if idx < len(run) and run[idx] == digest:
+                return True
+
+        return False
+
+    @property
+    def digests(self):
+        # all the digests as a single sorted array
+        self.merge()
+        self.merge_runs(1)
+        return self.runs[0] if self.runs else np.empty(0, dtype=np.uint64)
+
+    def add(self, digest) -> bool:
+        # adds the digest, returns False if it was already added (the maze is a duplicate)
+
+        # most digests are new, the bloom filter tells that without the binary search
+        is_new = self.bloom is not None and not self.bloom.add(digest)
+
+        if not is_new and digest in self:
+            return False
+
+        self.buffer.add(digest)
+
+        if len(self.buffer) >= self.buffer_size:
+            self.merge()
+
+        return True
+
+    def merge(self):
+        # turns the buffered digests into a sorted run, merging it with the runs that aren't bigger
+        if len(self.buffer) == 0:
+            return
+
+        new_digests = np.fromiter(self.buffer, dtype=np.uint64, count=len(self.buffer))
+        new_digests.sort()
+
+        self.runs.append(new_digests)
+        self.buffer.clear()
+
+        while len(self.runs) > 1 and len(self.runs[-2]) <= len(self.runs[-1]):
+            self.merge_runs(len(self.runs) - 1)
+
+    def merge_runs(self, num_runs):
+        # merges the last runs till there are num_runs of them
+        while len(self.runs) > num_runs:
+            last = self.runs.pop()
+            merged = np.concatenate((self.runs.pop(), last))
+            # two sorted halves, the stable sort takes advantage of that (much faster than a full sort)
+            merged.sort(kind='stable')
+            self.runs.append(merged)
+
+    def save(self, path):
+        # saves the digests as a sorted .npy array
+        np.save(path, self.digests)
+
+    @classmethod
+    def load(cls, path, buffer_size=1 << 16, bloom_capacity=None):
+        index = cls(buffer_size, bloom_capacity)
+        index.set_digests(np.load(path))
+        return index
+
+    @classmethod
+    def from_records(cls, records, buffer_size=1 << 16, bloom_capacity=None):
+        # index of the mazes with these maze store records, e.g. the mazes of a dataset so far
+        index = cls(buffer_size, bloom_capacity)
+
+        digests = np.fromiter((maze_digest(record) for record in records), dtype=np.uint64)
+        digests.sort()
+        index.set_digests(digests)
+
+        return index
+
+    def set_digests(self, digests):
+        # replaces all the digests with these ones (already sorted)
+        self.runs = [digests] if len(digests) > 0 else []
+        self.buffer.clear()
+
+        if self.bloom is not None:
+            for digest in digests.tolist():
+                self.bloom.add(digest)
@@ -0,0 +1,200 @@
+'''
+Writes rectangular mazes as PNG a strip of rows at a time, for mazes too big to fit in memory as an image
+
+The maze comes in as rows of passages (bitmask per cell, bits TOP, RIGHT, BOTTOM, LEFT like
+KruskalRectangular), e.g. from EllersRectangular.rows, which never has the whole maze in memory either.
+Every row becomes two rows of boxes of the grid (see RectangularKruskalMaze.create_maze_grid), the
+boxes are scaled to pixels and the pixels are compressed into the PNG right away. Only a strip of
+strip_height rows of boxes is in memory at a time, so memory depends on width x strip height.
+
+The images are 1-bit grayscale and have exactly the same pixels as RectangularKruskalMaze.create_maze_image.
+
+Example:
+    $ python maze_png.py -rows 1000 -cols 50000 -width 10 -output maze.png
+'''
+import argparse
+import struct
+import zlib
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# bits of the passages of a cell, same as KruskalRectangular & EllersRectangular
+RIGHT = 1
+BOTTOM = 2
+
+
+class PngWriter:
+    '''
+    1-bit grayscale PNG written a few rows at a time. the compressed data is written to the
+    file as soon as zlib gives it back, one IDAT chunk each time
+    '''
+
+    def __init__(self, path, width, height, compression_level=6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+
+        self.file = open(path, 'wb')
+        self.compressor = zlib.compressobj(compression_level)
+
+        self.file.write(PNG_SIGNATURE)
+        # bit depth 1, color type 0 (grayscale), deflate, no filters, no interlacing
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0))
+
+    def write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write_rows(self, pixels):
+        # pixels is a (rows, width) boolean array, True for white
+        if pixels.shape[1] != self.width:
+            raise Exception(f'Rows of {pixels.shape[1]} pixels, expected {self.width}')
+
+        if self.rows_written + len(pixels) > self.height:
+            raise Exception(f'More than {self.height} rows of pixels')
+
+        # every row of the PNG is a filter type (0: none) followed by 8 pixels per byte
+        scanlines = np.zeros((len(pixels), 1 + (self.width + 7) // 8), dtype=np.uint8)
+        scanlines[:, 1:] = np.packbits(pixels, axis=1)
+
+        data = self.compressor.compress(scanlines.tobytes())
+        if data:
+            self.write_chunk(b'IDAT', data)
+
+        self.rows_written += len(pixels)
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.file.close()
+            raise Exception(f'{self.rows_written} rows of pixels written, expected {self.height}')
+
+        self.write_chunk(b'IDAT', self.compressor.flush())
+        self.write_chunk(b'IEND', b'')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            # the image is incomplete anyway, keep the original error
+            self.file.close()
+
+
+def grid_rows(rows, num_rows):
+    '''
+    yields the rows of boxes of the (2*num_rows+1) x (2*row_len+1) grid, one at a time, from the rows of
+    passages. same grid as RectangularKruskalMaze.create_maze_grid, True where the box is open
+    '''
+    top_wall = None
+
+    for row_idx, row in enumerate(rows):
+        passages = np.frombuffer(row, dtype=np.uint8)
+        grid_len = 2 * len(passages) + 1
+
+        if top_wall is None:
+            # the boundary on top is all walls
+            top_wall = np.zeros(grid_len, dtype=bool)
+            yield top_wall
+
+        # boxes of the cells & between a cell and its right neighbour
+        cells = np.zeros(grid_len, dtype=bool)
+        cells[1::2] = True
+        cells[2:-1:2] = (passages[:-1] >> RIGHT) & 1
+
+        # the entrance is on the left of the first row, the exit on the right of the last one
+        if row_idx == 0:
+            cells[0] = True
+        if row_idx == num_rows - 1:
+            cells[-1] = True
+
+        yield cells
+
+        # boxes between a cell and its bottom neighbour, the bottom boundary is all walls
+        bottom = np.zeros(grid_len, dtype=bool)
+        if row_idx < num_rows - 1:
+            bottom[1::2] = (passages >> BOTTOM) & 1
+
+        yield bottom
+
+
+def save_maze_png(rows, row_len, num_rows, file_name, side_len, strip_height=4):
+    '''
+    saves the maze with num_rows rows of row_len cells, given as rows of passages, as PNG.
+    every box of the grid is side_len x side_len pixels, strip_height rows of boxes are drawn at a time
+    '''
+    grid_len = 2 * row_len + 1
+    width = grid_len * side_len
+    height = (2 * num_rows + 1) * side_len
+
+    with PngWriter(file_name, width, height) as png:
+        # last row of boxes of the previous strip
+        previous = np.zeros(grid_len, dtype=bool)
+
+        strip = []
+        for boxes in grid_rows(rows, num_rows):
+            strip.append(boxes)
+
+            if len(strip) == strip_height:
+                previous = write_strip(png, strip, previous, side_len)
+                strip = []
+
+        if len(strip) > 0:
+            write_strip(png, strip, previous, side_len)
+
+
+def write_strip(png, strip, previous, side_len):
+    # scales a strip of rows of boxes to pixels and writes them. returns the last row of boxes
+    boxes = np.array(strip)
+
+    # RectangularKruskalMaze.rasterize draws the first row & column of pixels of every box white
+    # if the box before it (above or left) is white. the box above the first one of the strip is
+    # the last one of the previous strip (all walls for the first strip)
+    boxes_above = np.concatenate((previous[None, :], boxes[:-1]))
+
+    pixels = np.repeat(np.repeat(boxes, side_len, axis=0), side_len, axis=1)
+    pixels[::side_len, :] |= np.repeat(boxes_above, side_len, axis=1)
+    pixels[:, side_len::side_len] |= pixels[:, side_len - 1:-1:side_len]
+
+    png.write_rows(pixels)
+
+    return boxes[-1]
+
+
+def graph_rows(spanning_tree, row_len):
+    # rows of passages of a maze created by KruskalRectangular, to save it with save_maze_png
+    passages = memoryview(spanning_tree.passages)
+    return (passages[start:start + row_len] for start in range(0, len(passages), row_len))
+
+
+if __name__ == '__main__':
+    from algorithms.ellers_rectangular import EllersRectangular
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-rows', default=100, help='Number of rows of cells')
+    parser.add_argument('-cols', default=100, help='Number of cells per row')
+    parser.add_argument('-width', default=10, help='Wall width in pixels')
+    parser.add_argument('-seed', help='Seed to recreate the same maze (random by default)')
+    parser.add_argument('-output', default='maze.png', help='Path of the PNG file')
+
+    args = parser.parse_args()
+
+    num_rows = int(args.rows)
+    row_len = int(args.cols)
+
+    # the maze is created while it is written, row by row
+    ellers = EllersRectangular(row_len)
+    save_maze_png(ellers.rows(num_rows, args.seed), row_len, num_rows, args.output, int(args.width))
@@ -0,0 +1,177 @@
+'''
+Compact binary file to store the spanning trees of a dataset of n x n mazes
+
+A spanning tree is stored as one bit per possible edge of the n x n grid
+(2 * n * (n-1) edges), 1 if the edge is part of the spanning tree (no wall),
+0 otherwise. Edges are numbered as:
+* right edge of cell (row, col): row * (n-1) + col
+* bottom edge of cell (row, col): n * (n-1) + row * n + col
+
+File layout:
+* header of HEADER_SIZE bytes: magic, version, n, record size, number of mazes
+* one record per maze, in order of maze ids. all records have the same size,
+  so the offset of a maze is HEADER_SIZE + maze_id * record_size
+'''
+import mmap
+import os
+import struct
+from typing import List, Tuple
+
+import numpy as np
+
+
+MAGIC = b'MAZT'
+VERSION = 1
+
+# magic, version, reserved, n, record size, number of mazes (+ padding to 32 bytes)
+HEADER_FORMAT = '<4sHHIIQ8x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+def record_size(n) -> int:
+    # number of bytes needed to store one bit per edge
+    return (2 * n * (n - 1) + 7) // 8
+
+
+def pack_edges(edges: List[Tuple[int, int]], n) -> bytes:
+    # edges of spanning tree (smaller cell first, like KruskalRectangular) to a record
+    bits = np.zeros(2 * n * (n - 1), dtype=np.uint8)
+
+    if len(edges) > 0:
+        edges = np.asarray(edges, dtype=np.int64)
+        cells = edges[:, 0]
+
+        # the other cell is either just right of the cell, or just below it
+        is_right_edge = edges[:, 1] == cells + 1
+
+        bit_indices = np.where(is_right_edge, (cells // n) * (n - 1) + cells % n, n * (n - 1) + cells)
+        bits[bit_indices] = 1
+
+    return np.packbits(bits, bitorder='little').tobytes()
+
+
+def unpack_edges(record, n) -> List[Tuple[int, int]]:
+    # edges of spanning tree from a record, sorted by the smaller cell
+    bits = np.unpackbits(np.frombuffer(record, dtype=np.uint8), count=2 * n * (n - 1), bitorder='little')
+
+    num_right_edges = n * (n - 1)
+
+    right_indices = np.flatnonzero(bits[:num_right_edges])
+    right_cells = (right_indices // (n - 1)) * n + right_indices % (n - 1)
+
+    bottom_cells = np.flatnonzero(bits[num_right_edges:])
+
+    edges = [(int(cell), int(cell) + 1) for cell in right_cells]
+    edges += [(int(cell), int(cell) + n) for cell in bottom_cells]
+    edges.sort()
+
+    return edges
+
+
+class MazeStoreWriter:
+
+    def __init__(self, path, n, num_mazes=None):
+        '''
+        creates a new file. if num_mazes is given, opens the existing file instead to continue
+        writing after its first num_mazes records (the records after them are discarded)
+        '''
+        self.path = path
+        self.n = n
+        self.record_size = record_size(n)
+
+        if num_mazes is None:
+            self.num_mazes = 0
+            self.file = open(path, 'wb')
+        else:
+            self.num_mazes = num_mazes
+            self.file = open(path, 'r+b')
+            self._check_header()
+            self.file.truncate(HEADER_SIZE + num_mazes * self.record_size)
+
+        self._write_header()
+
+    def _check_header(self):
+        magic, version, _, n, _, _ = struct.unpack(HEADER_FORMAT, self.file.read(HEADER_SIZE))
+
+        if magic != MAGIC or version != VERSION or n != self.n:
+            raise Exception(f'{self.path} is not a maze store file for {self.n} x {self.n} mazes')
+
+        # the header is only updated on flush, but the records before it are complete
+        file_mazes = (self.file.seek(0, 2) - HEADER_SIZE) // self.record_size
+        if file_mazes < self.num_mazes:
+            raise Exception(f'{self.path} has {file_mazes} mazes, expected at least {self.num_mazes}')
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, self.n, self.record_size, self.num_mazes))
+        self.file.seek(0, 2)
+
+    def append(self, record: bytes) -> int:
+        # adds the record of next maze, returns its maze id
+        if len(record) != self.record_size:
+            raise Exception(f'Record of {len(record)} bytes, expected {self.record_size}')
+
+        self.file.write(record)
+        self.num_mazes += 1
+        return self.num_mazes - 1
+
+    def flush(self, sync=False):
+        # updates number of mazes in header, so the file can be read while still being written.
+        # if sync, also waits until the file is on disk
+        self._write_header()
+        self.file.flush()
+
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MazeStore:
+    '''
+    reads a file created by MazeStoreWriter. the file is memory-mapped, so opening it
+    is instant for any size and reading a maze is O(1) without parsing anything
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.n, self.record_size, self.num_mazes = struct.unpack_from(HEADER_FORMAT, self.data)
+
+        if magic != MAGIC:
+            raise Exception(f'{path} is not a maze store file')
+        if version != VERSION:
+            raise Exception(f'Unsupported maze store version {version}')
+
+    def __len__(self):
+        return self.num_mazes
+
+    def record(self, maze_id) -> bytes:
+        if not 0 <= maze_id < self.num_mazes:
+            raise IndexError(f'Maze#{maze_id} not in store of {self.num_mazes} mazes')
+
+        offset = HEADER_SIZE + maze_id * self.record_size
+        return self.data[offset:offset + self.record_size]
+
+    def __getitem__(self, maze_id) -> List[Tuple[int, int]]:
+        # edges of spanning tree of given maze
+        return unpack_edges(self.record(maze_id), self.n)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
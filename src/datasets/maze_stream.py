@@ -0,0 +1,110 @@
+'''
+Streams mazes one at a time, without writing anything to disk
+
+Example:
+    for grid in iter_mazes('rectangular', 10, seed=42, output='grid'):
+        env.reset(grid)
+
+Maze i of a stream is created from seed f'{seed}:{i}', the same seeds RectangularDataset uses.
+So a stream can be started again from any maze (start=i), and a rectangular stream has the
+same mazes as a dataset created with the same seed (except the duplicates the dataset skips)
+'''
+import itertools
+import random
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../..")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from rectangular_kruskal_maze import RectangularKruskalMaze
+from maze_renderer import render_maze
+
+
+SHAPES = ('rectangular', 'triangular', 'hexagonal', 'circular')
+
+# what every maze of the stream is returned as
+# tree: MazeGraph of the spanning tree (all shapes)
+# edges: list of (cell, neighbour) edges of the spanning tree, cell < neighbour (all shapes)
+# grid: (2n+1) x (2n+1) boolean array, True for open boxes (rectangular only)
+# image: PIL image (all shapes, drawn with maze_renderer except rectangular)
+OUTPUTS = ('tree', 'edges', 'grid', 'image')
+
+
+def create_tree_factory(shape, size, side_len):
+    '''
+    returns the shape object and a function that takes a seed and creates the spanning tree of a maze.
+    the shape object (and its topology) is created once & shared by every maze of the stream
+    '''
+    # the other shapes import turtle (for drawing), so they are only imported when needed
+    if shape == 'triangular':
+        from triangular import TriangularMaze
+        maze = TriangularMaze(side_len, size)
+        return maze, lambda seed: maze.kruskal_spanning_tree(maze.get_graph_edges(), seed)
+
+    if shape == 'hexagonal':
+        from hexagonal import HexagonalMaze
+        maze = HexagonalMaze(side_len, size)
+        return maze, maze.create_dfs_tree
+
+    if shape == 'circular':
+        from circular import CircularMaze
+        maze = CircularMaze(size, side_len)
+        return maze, maze.create_dfs_tree
+
+    raise Exception(f'Unknown shape {shape}, expected one of {SHAPES}')
+
+
+def iter_mazes(shape, size, seed=None, output='tree', side_len=10, count=None, start=0):
+    '''
+    yields mazes lazily, only one maze is kept in memory at a time
+
+    shape: one of SHAPES
+    size: number of cells per row (rectangular) or levels (the other shapes)
+    seed: seed of the stream, random if not given
+    output: one of OUTPUTS
+    side_len: wall width in pixels for images, size of cells for the other shapes
+    count: number of mazes, None for an endless stream
+    start: index of the first maze, to continue a stream
+    '''
+    if output not in OUTPUTS:
+        raise Exception(f'Unknown output {output}, expected one of {OUTPUTS}')
+
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    indices = itertools.count(start) if count is None else range(start, start + count)
+
+    if shape == 'rectangular':
+        generator = RectangularKruskalMaze(size, side_len)
+
+        for idx in indices:
+            maze_seed = f'{seed}:{idx}'
+
+            if output == 'image':
+                yield generator.create_maze_image(rng=maze_seed)[1]
+            elif output == 'grid':
+                yield generator.create_maze_array(rng=maze_seed)[1]
+            else:
+                spanning_tree, edges = generator.create_spanning_tree(rng=maze_seed)
+                yield spanning_tree if output == 'tree' else edges
+        return
+
+    if output == 'grid':
+        raise Exception(f'Output {output} is only supported for rectangular mazes')
+
+    maze, create_tree = create_tree_factory(shape, size, side_len)
+
+    for idx in indices:
+        maze_seed = f'{seed}:{idx}'
+        spanning_tree = create_tree(maze_seed)
+
+        if output == 'image':
+            yield render_maze(maze, spanning_tree, rng=maze_seed)
+        else:
+            yield spanning_tree if output == 'tree' else list(spanning_tree.edges())
+
+
+if __name__ == '__main__':
+    for maze_edges in iter_mazes('rectangular', 4, seed=42, output='edges', count=3):
+        print(maze_edges)
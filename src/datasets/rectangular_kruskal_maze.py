@@ -5,10 +5,17 @@ Creates Dataset of Rectangular Mazes
 import math
 import time
 import pprint
-import random
-from PIL import Image, ImageDraw
 
-from src.algorithms.disjoint_set import DisjointSet
+import numpy as np
+from PIL import Image
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.disjoint_set import DisjointSet
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng, make_numpy_rng
 
 
 class KruskalRectangular:
@@ -29,6 +36,23 @@ class KruskalRectangular:
         self.BOTTOM = 2
         self.LEFT = 3
 
+        self.topology = self.create_topology()
+
+    def create_topology(self):
+        # squared grid graph, each cell has a slot for TOP, RIGHT, BOTTOM, LEFT neighbours
+        neighbours = []
+
+        for cell in range(self.total_cells):
+            row, col = self.index_2d(cell)
+
+            neighbours.append(cell - self.n if row > 0 else NO_NEIGHBOUR)
+            neighbours.append(cell + 1 if col < self.n - 1 else NO_NEIGHBOUR)
+            neighbours.append(cell + self.n if row < self.n - 1 else NO_NEIGHBOUR)
+            neighbours.append(cell - 1 if col > 0 else NO_NEIGHBOUR)
+
+        # TOP <-> BOTTOM, RIGHT <-> LEFT
+        return MazeTopology.fixed_degree(neighbours, 4, opposite=(self.BOTTOM, self.LEFT, self.TOP, self.RIGHT))
+
     def create_graph(self):
         # creates a graph aligned with squared grid pattern
 
@@ -65,17 +89,16 @@ class KruskalRectangular:
         # return graph, edges
         return edges
 
-    def kruskal_spanning_tree(self):
+    def kruskal_spanning_tree(self, rng=None):
         # creates s Spanning Tree using Randomized Kruskal's for given graph while picking edges at random and
         # including their vertices in the graph if not already in such a way that there are no cycles
+        rng = make_rng(rng)
 
         edges_of_graph = self.create_graph()
 
         # the minimum spanning tree has no edges in the start
-        # PARENT, LEFT, RIGHT, CHILD
-        spanning_tree = {
-            cell: [0, 0, 0, 0] for cell in range(self.total_cells)
-        }
+        # TOP, RIGHT, BOTTOM, LEFT
+        spanning_tree = MazeGraph(self.topology)
 
         # record all the edges involved in Spanning Tree
         edges = []
@@ -85,7 +108,7 @@ class KruskalRectangular:
 
         disjoint = DisjointSet(cells)
 
-        random.shuffle(edges_of_graph)
+        rng.shuffle(edges_of_graph)
 
         for edge in edges_of_graph:
             # pick one edge at random, connecting to a new cell that is not already in visited.
@@ -95,19 +118,107 @@ class KruskalRectangular:
             if disjoint.find(cell1) != disjoint.find(cell2):
                 disjoint.union(cell1, cell2)
 
-                # connect these two nodes in the spanning tree
+                # connect these two nodes in the spanning tree (and vice versa)
                 direction = self.get_neighbour_dir(cell1, cell2)
-                spanning_tree[cell1][direction] = 1
-
-                # also set it vice versa
-                neighbour_dir = self.get_neighbour_dir(cell2, cell1)
-                spanning_tree[cell2][neighbour_dir] = 1
+                spanning_tree.connect(cell1, direction)
 
                 # also add to the list of edges for our spanning tree
                 edges.append(edge)
 
         return spanning_tree, edges
 
+    def kruskal_spanning_trees(self, num_mazes, seed=None, stream=0):
+        '''
+        creates num_mazes Spanning Trees at once with NumPy, returns their passages as (num_mazes, n, n)
+        uint8 array: bit TOP, RIGHT, BOTTOM, LEFT of [maze, row, col] is set if the cell is connected to
+        its neighbour in that direction (same bitmask as MazeGraph.passages)
+
+        Randomized Kruskal's adds the edges in a random order. That is the same as giving the edges
+        random distinct weights and taking the minimum spanning tree. Boruvka's finds the same tree
+        in log2(cells) rounds instead of one step per edge, and every round is a few array operations
+        over the edges of all the mazes together:
+        1. every component picks its lightest edge to another component, these are in the tree
+        2. the components joined by the picked edges are merged (pointer jumping)
+        '''
+        rng = make_numpy_rng(seed, stream)
+
+        n = self.n
+
+        # every edge once, right edges then bottom edges, both row by row (same order as maze store bits)
+        cells = np.arange(self.total_cells, dtype=np.int32).reshape(n, n)
+        cell1 = np.concatenate((cells[:, :-1].ravel(), cells[:-1, :].ravel()))
+        cell2 = np.concatenate((cells[:, 1:].ravel(), cells[1:, :].ravel()))
+        num_edges = len(cell1)
+
+        # distinct weights (a random order of the edges) for every maze
+        weights = rng.permuted(np.broadcast_to(np.arange(num_edges, dtype=np.int32), (num_mazes, num_edges)), axis=1)
+
+        # all the mazes are a single big graph: cell c of maze m is m * total_cells + c,
+        # edge e of maze m is m * num_edges + e
+        first_cells = np.arange(num_mazes, dtype=np.int64)[:, None] * self.total_cells
+        edges = np.arange(num_mazes * num_edges)
+        weights = weights.ravel()
+
+        # components of the two cells of every edge. the component of a cell is the index of one
+        # of its cells, all cells are separate in the start
+        component1 = (cell1 + first_cells).ravel()
+        component2 = (cell2 + first_cells).ravel()
+
+        all_cells = np.arange(num_mazes * self.total_cells)
+
+        in_tree = np.zeros(num_mazes * num_edges, dtype=bool)
+
+        while True:
+            # edges inside a component would make cycles, now & in every round after this one
+            outgoing = np.flatnonzero(component1 != component2)
+            if len(outgoing) == 0:
+                break
+
+            edges, weights = edges[outgoing], weights[outgoing]
+            component1, component2 = component1[outgoing], component2[outgoing]
+
+            # lightest outgoing edge of every component (from either of its sides)
+            lightest = np.full(len(all_cells), num_edges, dtype=np.int32)
+            np.minimum.at(lightest, component1, weights)
+            np.minimum.at(lightest, component2, weights)
+
+            picked1 = weights == lightest[component1]
+            picked2 = weights == lightest[component2]
+            in_tree[edges[picked1 | picked2]] = True
+
+            # every component points to the one its lightest edge goes to
+            target = all_cells.copy()
+            target[component1[picked1]] = component2[picked1]
+            target[component2[picked2]] = component1[picked2]
+
+            # two components that picked the same edge point to each other, the smaller one becomes the root
+            mutual = (target[target] == all_cells) & (all_cells < target)
+            target[mutual] = all_cells[mutual]
+
+            # follow the pointers till every component points to its root
+            while True:
+                next_target = target[target]
+                if np.array_equal(next_target, target):
+                    break
+                target = next_target
+
+            component1 = target[component1]
+            component2 = target[component2]
+
+        in_tree = in_tree.reshape(num_mazes, num_edges)
+
+        # passages of each cell, right & bottom edges also open left & top of the neighbour
+        right = in_tree[:, :n * (n - 1)].reshape(num_mazes, n, n - 1).astype(np.uint8)
+        bottom = in_tree[:, n * (n - 1):].reshape(num_mazes, n - 1, n).astype(np.uint8)
+
+        passages = np.zeros((num_mazes, n, n), dtype=np.uint8)
+        passages[:, :, :-1] |= right << self.RIGHT
+        passages[:, :, 1:] |= right << self.LEFT
+        passages[:, :-1, :] |= bottom << self.BOTTOM
+        passages[:, 1:, :] |= bottom << self.TOP
+
+        return passages
+
     def index_2d(self, cell_1d):
 
         row = cell_1d // self.n
@@ -136,11 +247,11 @@ class KruskalRectangular:
         n = 4
         kr = KruskalRectangular(n)
 
-        graph, edges = kr.create_graph()
+        spanning_tree, edges = kr.kruskal_spanning_tree()
 
         print("Kruskal Spanning Tree (as adjacency list):")
         pprint.pp(
-            kr.kruskal_spanning_tree(edges)
+            spanning_tree.to_adjacency_list()
         )
 
 
@@ -150,12 +261,10 @@ class RectangularKruskalMaze:
         self.n = n
         self.side_len = side_len
 
-    def create_maze_image(self, file_name=None):
-
-        # create a spanning using Kruskal's Randomized to depict our maze
-        algo = KruskalRectangular(self.n)
-        spanning_tree, edges = algo.kruskal_spanning_tree()
+        # its topology is shared by all the mazes created by this object
+        self.algo = KruskalRectangular(self.n)
 
+    def create_maze_grid(self, spanning_tree, algo):
         '''
         the indices of grid are 0, 1, 2, ...., 2*n
         between them, the cells that correspond to cells of maze (adjacency matrix) 
@@ -164,66 +273,89 @@ class RectangularKruskalMaze:
         in between these cells, we will insert 'filler' cells that will
         represent the connection / edge between these cells or the walls.
         that's why those gaps (even cells) exist
+
+        returns the (2n+1) x (2n+1) grid as boolean array, True where the box is white (open)
         '''
 
+        # bitmask of connections of each cell, as n x n array
+        passages = np.frombuffer(spanning_tree.passages, dtype=np.uint8).reshape(self.n, self.n)
+
+        return self.passages_to_grid(passages, algo)
+
+    def passages_to_grid(self, passages, algo):
+        # same as create_maze_grid, from the (..., n, n) passages bitmasks of one or more mazes
         grid_len = 2 * self.n + 1
 
-        image_width = grid_len * self.side_len
-        image_height = image_width
-        # print('Image Dimensions:', image_width, 'x', image_height)
+        # everything is a wall in the start
+        grid = np.zeros(passages.shape[:-2] + (grid_len, grid_len), dtype=bool)
+
+        # boxes of all the cells are open
+        grid[..., 1::2, 1::2] = True
+
+        # open the box between a cell & its right neighbour if they are connected.
+        # only right & bottom connections are needed, the left & top ones are the same boxes
+        grid[..., 1::2, 2:-1:2] = (passages[..., :, :-1] >> algo.RIGHT) & 1
+        grid[..., 2:-1:2, 1::2] = (passages[..., :-1, :] >> algo.BOTTOM) & 1
 
-        maze_image = Image.new(mode='1', size=(image_width, image_height), color=(0))
-        canvas = ImageDraw.Draw(maze_image)
+        # the entrance to the maze is the box in our grid at 0,1
+        grid[..., 1, 0] = True
 
-        # center of origin for PIL is upper left corner
+        # the exit to the maze is the box in last column and 2nd last row
+        grid[..., 2 * self.n - 1, 2 * self.n] = True
+
+        return grid
 
-        # length of the side of a box / square / cell. for easier access
+    def rasterize(self, grid):
+        # scales the grid to pixels, each box of grid becomes a side x side square
         side = self.side_len
 
-        # the image is black. just draw white boxes where the cells appear
-        # or where a connection between two connected cell appears.
-        # we only need to draw the right and bottom connection for the current cell.
-        for row in range(self.n):
-            for col in range(self.n):
+        pixels = np.repeat(np.repeat(grid, side, axis=0), side, axis=1)
+
+        # the boxes used to be drawn with ImageDraw.rectangle, which includes both end points,
+        # so every white box also covered the first row & column of pixels of the boxes
+        # after it (towards bottom & right). keep doing that so images stay exactly the same
+        pixels[side::side, :] |= pixels[side - 1:-1:side, :]
+        pixels[:, side::side] |= pixels[:, side - 1:-1:side]
+
+        # boolean array becomes an image with mode '1'
+        return Image.fromarray(pixels)
 
-                x = (2 * col + 1) * side
-                y = (2 * row + 1) * side
+    def create_spanning_tree(self, rng=None):
+        # create a spanning using Kruskal's Randomized to depict our maze
+        spanning_tree, edges = self.algo.kruskal_spanning_tree(rng)
 
-                # draw this cell
-                canvas.rectangle([(x, y), (x+side, y+side)], width=side, fill='white')
+        # sort the edges so they could be saved as graph representation and compared to avoid duplicate trees
+        # each edge has a smaller indexed node at index 0. we will sort by using that vertex, all the edge tuples
+        # and this convention will be used to detect duplicates.
+        edges.sort(key=lambda edg: edg[0])
 
-                # cell index in 1D form
-                node = row * self.n + col
+        return spanning_tree, edges
 
-                # draw connections too (each cell checks right & bottom connections)
+    def create_maze_array(self, rng=None):
+        # creates a maze without drawing it. returns the sorted edges of spanning tree
+        # and the maze as (2n+1) x (2n+1) boolean grid, see create_maze_grid
+        spanning_tree, edges = self.create_spanning_tree(rng)
 
-                # if the node has a right neighbour and is connected to it
-                if col + 1 < self.n and spanning_tree[node][algo.RIGHT] == 1:
-                    canvas.rectangle([(x+side, y), (x + 2*side, y + side)], width=side, fill='white')
+        return edges, self.create_maze_grid(spanning_tree, self.algo)
 
-                # if this cell has a bottom neighbour (i.e. this cell is not in the last row)
-                # and is connected to the bottom neighbour
-                if row + 1 < self.n and spanning_tree[node][algo.BOTTOM] == 1:
-                    canvas.rectangle([(x, y+1), (x + side, y + 2*side)], width=side, fill='white')
+    def create_maze_arrays(self, num_mazes, seed=None, stream=0):
+        # creates num_mazes mazes at once (see KruskalRectangular.kruskal_spanning_trees),
+        # returns them as (num_mazes, 2n+1, 2n+1) boolean grids
+        passages = self.algo.kruskal_spanning_trees(num_mazes, seed, stream)
 
-        # the entrance to the maze is the box in our grid at 0,side
-        canvas.rectangle([(0, side), (side, 2*side)], width=side, fill='white')
+        return self.passages_to_grid(passages, self.algo)
 
-        # the exit to the maze is the box in last column and 2nd last row
-        x = 2 * self.n * side
-        y = (2 * self.n - 1) * side
-        canvas.rectangle([(x, y), (x + side, y + side)], width=side, fill='white')
+    def create_maze_image(self, file_name=None, rng=None):
+
+        edges, grid = self.create_maze_array(rng)
+
+        maze_image = self.rasterize(grid)
 
         if file_name is not None:
             maze_image.save(file_name)
         else:
             # if path not provided, return edges and imaeg
 
-            # sort the edges so they could be saved as graph representation and compared to avoid duplicate trees
-            # each edge has a smaller indexed node at index 0. we will sort by using that vertex, all the edge tuples
-            # and this convention will be used to detect duplicates.
-            edges.sort(key=lambda edg: edg[0])
-
             # print("Edges in the Graph:")
             # pprint.pp(edges)
             return edges, maze_image
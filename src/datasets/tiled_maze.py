@@ -0,0 +1,204 @@
+'''
+Creates a single huge rectangular maze (10^8 cells and more) in parallel
+
+The n x n grid is cut into tiles of tile_len x tile_len cells. Every tile gets its own
+spanning tree with Randomized Kruskal's, in worker processes, independently of the others.
+Then the tiles are joined into a single spanning tree: Kruskal's again, but over the edges
+on the boundaries between tiles only, and with a disjoint set of tiles instead of cells
+(every tile is already connected). So the merge is tiny compared to the tiles.
+
+The tiles are joined by exactly (number of tiles - 1) passages, so the walls along the
+boundaries of tiles are longer than in a maze created by KruskalRectangular. Bigger tiles
+make them rarer.
+
+Unlike KruskalRectangular, the topology (a few ints per cell) is never built, the maze is
+returned as the n x n array of passages (bits TOP, RIGHT, BOTTOM, LEFT of every cell).
+Save it as an image with maze_png.save_maze_png(iter(passages), n, n, file_name, side_len).
+
+Example:
+    $ python tiled_maze.py -rows 10000 -tile 1000 -workers 32 -output maze.png
+'''
+import argparse
+import time
+from array import array
+from multiprocessing import Pool
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from algorithms.disjoint_set import CompactDisjointSet
+from algorithms.random_source import make_numpy_rng
+
+
+def grid_edges(rows, cols):
+    # every edge of a rows x cols grid once, as (cell, is right edge). the others are bottom edges
+    cells = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+
+    right_cells = cells[:, :-1].ravel()
+    bottom_cells = cells[:-1, :].ravel()
+
+    edge_cells = np.concatenate((right_cells, bottom_cells))
+    is_right = np.concatenate((np.ones(len(right_cells), dtype=bool), np.zeros(len(bottom_cells), dtype=bool)))
+
+    return edge_cells, is_right
+
+
+def int_array(values):
+    # numpy ints as array('i') for CompactDisjointSet.union_many, 4 bytes each instead of a list of Python ints
+    return array('i', values.astype(np.int32).tobytes())
+
+
+def span_tile(task):
+    '''
+    creates the spanning tree of one tile, runs in the worker processes (or the main one if there are no workers).
+    task is (seed, tile index, rows, cols, directions). the tile uses the stream of its index of the seed,
+    so the maze is the same for any number of workers.
+    returns the tile index and the passages of its cells as rows x cols uint8 array
+    '''
+    seed, tile_idx, rows, cols, (top, right, bottom, left) = task
+
+    rng = make_numpy_rng(seed, tile_idx)
+
+    edge_cells, is_right = grid_edges(rows, cols)
+    other_cells = edge_cells + np.where(is_right, 1, cols)
+
+    # Kruskal's: all the edges in random order, the ones joining two different sets make the spanning tree
+    order = rng.permutation(len(edge_cells))
+    merged = CompactDisjointSet(rows * cols).union_many(int_array(edge_cells[order]), int_array(other_cells[order]))
+    tree_edges = order[np.frombuffer(merged, dtype=np.uint8).astype(bool)]
+
+    passages = np.zeros(rows * cols, dtype=np.uint8)
+
+    # a cell has a single right & a single bottom edge, so there are no repeated indices
+    right_edges = tree_edges[is_right[tree_edges]]
+    passages[edge_cells[right_edges]] |= 1 << right
+    passages[other_cells[right_edges]] |= 1 << left
+
+    bottom_edges = tree_edges[~is_right[tree_edges]]
+    passages[edge_cells[bottom_edges]] |= 1 << bottom
+    passages[other_cells[bottom_edges]] |= 1 << top
+
+    return tile_idx, passages.reshape(rows, cols)
+
+
+class TiledKruskalRectangular:
+
+    def __init__(self, n, tile_len=1024):
+        self.n = n
+        self.tile_len = tile_len
+
+        # tiles per row (and per column), the last ones are smaller if tile_len doesn't divide n
+        self.num_tiles_per_row = (n + tile_len - 1) // tile_len
+        self.num_tiles = self.num_tiles_per_row ** 2
+
+        # same directions as KruskalRectangular
+        self.TOP = 0
+        self.RIGHT = 1
+        self.BOTTOM = 2
+        self.LEFT = 3
+
+    def tile_tasks(self, seed):
+        directions = (self.TOP, self.RIGHT, self.BOTTOM, self.LEFT)
+
+        for tile_idx in range(self.num_tiles):
+            tile_row, tile_col = divmod(tile_idx, self.num_tiles_per_row)
+
+            rows = min(self.tile_len, self.n - tile_row * self.tile_len)
+            cols = min(self.tile_len, self.n - tile_col * self.tile_len)
+
+            yield seed, tile_idx, rows, cols, directions
+
+    def spanning_tree(self, seed=None, num_workers=1):
+        '''
+        returns the passages of the maze as n x n uint8 array. the same seed (int or str) always
+        creates the same maze, with any number of workers
+        '''
+        if seed is None:
+            # every tile needs the same seed (with its own stream)
+            seed = np.random.SeedSequence().entropy
+
+        n = self.n
+        tile_len = self.tile_len
+
+        passages = np.zeros((n, n), dtype=np.uint8)
+
+        # 1. spanning tree of every tile, copied into the maze as soon as it's done
+        pool = Pool(num_workers) if num_workers > 1 else None
+        try:
+            tasks = self.tile_tasks(seed)
+            results = pool.imap_unordered(span_tile, tasks) if pool is not None else map(span_tile, tasks)
+
+            for tile_idx, tile_passages in results:
+                tile_row, tile_col = divmod(tile_idx, self.num_tiles_per_row)
+                row_start = tile_row * tile_len
+                col_start = tile_col * tile_len
+
+                passages[row_start:row_start + tile_passages.shape[0], col_start:col_start + tile_passages.shape[1]] = \
+                    tile_passages
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # 2. join the tiles with the edges on their boundaries: right edges of the last column of
+        # every tile & bottom edges of the last row of every tile (except the ones at the end of grid)
+        boundaries = np.arange(tile_len - 1, n - 1, tile_len, dtype=np.int64)
+        all_rows = np.arange(n, dtype=np.int64)
+
+        right_cells = (all_rows[:, None] * n + boundaries[None, :]).ravel()
+        bottom_cells = (boundaries[:, None] * n + all_rows[None, :]).ravel()
+
+        edge_cells = np.concatenate((right_cells, bottom_cells))
+        is_right = np.concatenate((np.ones(len(right_cells), dtype=bool), np.zeros(len(bottom_cells), dtype=bool)))
+        other_cells = edge_cells + np.where(is_right, 1, n)
+
+        # the tiles of both cells, all the cells of a tile are already connected
+        def tile_of(cells):
+            return (cells // n // tile_len) * self.num_tiles_per_row + cells % n // tile_len
+
+        rng = make_numpy_rng(seed, self.num_tiles)
+        order = rng.permutation(len(edge_cells))
+
+        merged = CompactDisjointSet(self.num_tiles).union_many(
+            int_array(tile_of(edge_cells[order])), int_array(tile_of(other_cells[order]))
+        )
+        tree_edges = order[np.frombuffer(merged, dtype=np.uint8).astype(bool)]
+
+        flat_passages = passages.reshape(-1)
+
+        right_edges = tree_edges[is_right[tree_edges]]
+        flat_passages[edge_cells[right_edges]] |= 1 << self.RIGHT
+        flat_passages[other_cells[right_edges]] |= 1 << self.LEFT
+
+        bottom_edges = tree_edges[~is_right[tree_edges]]
+        flat_passages[edge_cells[bottom_edges]] |= 1 << self.BOTTOM
+        flat_passages[other_cells[bottom_edges]] |= 1 << self.TOP
+
+        return passages
+
+
+if __name__ == '__main__':
+    from maze_png import save_maze_png
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-rows', default=1000, help='Number of rows (or cells per row)')
+    parser.add_argument('-tile', default=1024, help='Number of rows (or cells per row) of a tile')
+    parser.add_argument('-workers', default=1, help='Number of processes creating tiles in parallel')
+    parser.add_argument('-seed', help='Seed to recreate the same maze (random by default)')
+    parser.add_argument('-output', help='Saves the maze as PNG if given')
+    parser.add_argument('-width', default=2, help='Wall width in pixels of the PNG')
+
+    args = parser.parse_args()
+
+    n = int(args.rows)
+
+    start_time = time.time()
+    maze_passages = TiledKruskalRectangular(n, int(args.tile)).spanning_tree(args.seed, int(args.workers))
+    print(f'{n} x {n} maze created in {time.time() - start_time:.2f} seconds')
+
+    if args.output is not None:
+        save_maze_png(iter(maze_passages), n, n, args.output, int(args.width))
@@ -1,10 +1,17 @@
 import pprint
-import random
-from collections import deque
-from turtle import *
+from array import array
+from collections import OrderedDict
+try:
+    from turtle import *
+except ImportError:
+    # no Tk on this machine, mazes can still be drawn with maze_renderer
+    pass
 import math
 from typing import Tuple
 from color_scheme import ColorScheme
+from algorithms.level_layout import LevelLayout
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
 
 
 class HexagonalMaze:
@@ -15,6 +22,11 @@ class HexagonalMaze:
     middle level has the most cell
     '''
 
+    # neighbour tables (MazeTopology) by num_levels, see create_topology. only the most recently
+    # used sizes are kept, so the tables of sizes no longer used don't stay in memory
+    TOPOLOGY_CACHE_SIZE = 4
+    topology_cache = OrderedDict()
+
     def __init__(self, side_len, num_levels):
         self.side_len = side_len
 
@@ -29,6 +41,9 @@ class HexagonalMaze:
 
         self.total_cells = sum(self.num_cells_at_level)
 
+        # converts between 1D & 2D indices
+        self.layout = LevelLayout(self.num_cells_at_level)
+
         # y component of single small hexagon. height above its center
         self.y_component = self.calc_y_comp()
 
@@ -42,7 +57,9 @@ class HexagonalMaze:
 
         self.clr_scheme = ColorScheme()
 
-        self.spanning_tree = []
+        self.topology = self.create_topology()
+
+        self.spanning_tree = MazeGraph(self.topology)
 
     def calc_num_cells_at_each_level(self):
         num_cells = [0 for i in range(self.num_levels)]
@@ -83,23 +100,11 @@ class HexagonalMaze:
 
     def index_1d(self, level, cell):
         # takes the level & cell (the 2D indices) and converts them to their corresponding 1D index
-        if level >= self.num_levels:
-            raise Exception("level greater than maze levels")
-        return sum(self.num_cells_at_level[:level]) + cell
+        return self.layout.index_1d(level, cell)
 
     def index_2d(self, idx) -> Tuple[int, int]:
         # takes index of cell in 1-D array form and converts to 2D
-        if idx >= self.total_cells:
-            raise Exception("1D index greater than total number of cells")
-
-        level = 0
-        while idx - self.num_cells_at_level[level] >= 0:
-            idx -= self.num_cells_at_level[level]
-            level += 1
-
-        # the remaining cells give the index of cell at current level
-        cell = idx
-        return level, cell
+        return self.layout.index_2d(idx)
 
     def have_num_cells_been_increasing(self, level):
         # number of cells increase up until middle level
@@ -155,59 +160,125 @@ class HexagonalMaze:
             return self.index_1d(level + 1, cell + 1)
         return self.index_1d(level + 1, cell)
 
-    def create_dfs_tree(self):
+    def create_topology(self):
+        # neighbour table: each cell has a slot for each of its 6 edges, in the same order as directions:
+        # BOTTOM, BOTTOM_RIGHT, TOP_RIGHT, TOP, TOP_LEFT, BOTTOM_LEFT
+        # it only depends on num_levels, so it is built once and shared by all mazes of the same size
+        cache = HexagonalMaze.topology_cache
+        if self.num_levels in cache:
+            cache.move_to_end(self.num_levels)
+            return cache[self.num_levels]
+
+        neighbours = array('i', [NO_NEIGHBOUR]) * (6 * self.total_cells)
+
+        last_level = self.num_levels - 1
+
+        for level in range(self.num_levels):
+            n = self.num_cells_at_level[level]
+
+            # 1D index of first cell of previous, current & next level
+            start = self.layout.offsets[level]
+            prev_start = self.layout.offsets[level - 1] if level > 0 else 0
+            next_start = self.layout.offsets[level + 1]
+
+            none = [NO_NEIGHBOUR]
+
+            # same logic as the *_idx methods, but for a whole level at once
+            if level == last_level:
+                left_children = none * n
+                right_children = none * n
+            elif level < self.middle_level:
+                left_children = range(next_start, next_start + n)
+                right_children = range(next_start + 1, next_start + n + 1)
+            else:
+                left_children = none + list(range(next_start, next_start + n - 1))
+                right_children = list(range(next_start, next_start + n - 1)) + none
+
+            right_cells = list(range(start + 1, start + n)) + none
+            left_cells = none + list(range(start, start + n - 1))
+
+            if level == 0:
+                right_parents = none * n
+                left_parents = none * n
+            elif self.have_num_cells_been_increasing(level):
+                right_parents = list(range(prev_start, prev_start + n - 1)) + none
+                left_parents = none + list(range(prev_start, prev_start + n - 1))
+            else:
+                right_parents = range(prev_start + 1, prev_start + n + 1)
+                left_parents = range(prev_start, prev_start + n)
+
+            # write each direction in its slot, for all the cells of this level
+            end = 6 * (start + n)
+            neighbours[6 * start + self.BOTTOM:end:6] = array('i', left_children)
+            neighbours[6 * start + self.BOTTOM_RIGHT:end:6] = array('i', right_children)
+            neighbours[6 * start + self.TOP_RIGHT:end:6] = array('i', right_cells)
+            neighbours[6 * start + self.TOP:end:6] = array('i', right_parents)
+            neighbours[6 * start + self.TOP_LEFT:end:6] = array('i', left_parents)
+            neighbours[6 * start + self.BOTTOM_LEFT:end:6] = array('i', left_cells)
+
+        # the shared edge of two hexagons is opposite for both of them. e.g. BOTTOM <-> TOP
+        topology = MazeTopology.fixed_degree(neighbours, 6, opposite=(
+            self.TOP, self.TOP_LEFT, self.BOTTOM_LEFT, self.BOTTOM, self.BOTTOM_RIGHT, self.TOP_RIGHT
+        ))
+
+        cache[self.num_levels] = topology
+        if len(cache) > HexagonalMaze.TOPOLOGY_CACHE_SIZE:
+            # least recently used
+            cache.popitem(last=False)
+
+        return topology
+
+    def create_dfs_tree(self, rng=None):
         # using DFS randomized, creates a Spanning Tree
+        rng = make_rng(rng)
 
-        # 0 means not connected, 1 means connected. order of neighbours:
+        # a bit for each neighbour, 0 means not connected, 1 means connected. order of neighbours:
         # BOTTOM, RIGHT_BOTTOM, RIGHT_TOP, TOP, LEFT_TOP, LEFT_BOTTOM
-        spanning_tree = [
-            [0, 0, 0, 0, 0, 0] for _ in range(self.total_cells)
-        ]
+        spanning_tree = MazeGraph(self.topology)
 
         # pick a random starting cell
-        cell_1d = random.randint(0, self.total_cells - 1)
+        cell_1d = rng.randint(0, self.total_cells - 1)
 
-        visited = [cell_1d]
-        stack = deque()
-        stack.append(cell_1d)
+        # visited[cell] is 1 once the cell is part of the spanning tree
+        visited = bytearray(self.total_cells)
+        visited[cell_1d] = 1
+        num_visited = 1
 
-        while len(visited) < self.total_cells:
-            # randomly pick a neighbour of current cell and go there
-
-            # get 2D representation of current cell
-            level, cell = self.index_2d(cell_1d)
+        # a cell is pushed on the stack only once, so it never holds more than total_cells
+        stack = array('i', bytes(4 * self.total_cells))
+        stack[0] = cell_1d
+        stack_size = 1
 
-            connections = [
-                self.left_parent_idx(level, cell),
-                self.right_parent_idx(level, cell),
-                self.left_cell_idx(level, cell),
-                self.right_cell_idx(level, cell),
-                self.left_child_idx(level, cell),
-                self.right_child_idx(level, cell),
-            ]
+        # neighbour table, neighbours[6 * cell + direction] is the neighbour in that direction
+        neighbours = self.topology.neighbours
 
-            valid_connections = []
-            for conn in connections:
-                if conn is not None and conn not in visited:
-                    valid_connections.append(conn)
+        while num_visited < self.total_cells:
+            # randomly pick a neighbour of current cell and go there
 
-            if len(valid_connections) > 0:
-                next_cell = random.choice(valid_connections)
+            # directions of the neighbours not visited yet
+            valid_directions = []
+            for direction in range(6):
+                conn = neighbours[6 * cell_1d + direction]
+                if conn != NO_NEIGHBOUR and not visited[conn]:
+                    valid_directions.append(direction)
 
-                visited.append(next_cell)
-                stack.append(next_cell)
+            if len(valid_directions) > 0:
+                direction = rng.choice(valid_directions)
 
                 # add this connection to the graph, for both cells
-                # get direction of next_cell compared to cell_1d & vice versa
-                direction = self.get_neighbour_dir(cell_1d, next_cell)
-                spanning_tree[cell_1d][direction] = 1
+                next_cell = spanning_tree.connect(cell_1d, direction)
 
-                reverse_direction = self.get_neighbour_dir(next_cell, cell_1d)
-                spanning_tree[next_cell][reverse_direction] = 1
+                visited[next_cell] = 1
+                num_visited += 1
+
+                stack[stack_size] = next_cell
+                stack_size += 1
 
                 cell_1d = next_cell
             else:
-                cell_1d = stack.pop()
+                # pop from stack
+                stack_size -= 1
+                cell_1d = stack[stack_size]
 
         return spanning_tree
 
@@ -215,34 +286,21 @@ class HexagonalMaze:
         # gives the direction of cell2 with respect to cell1
         # reference: media/reference-hexagon-for-maze.PNG
 
-        c1_level, c1_idx = self.index_2d(cell1)
-
-        # using brute force approach, because using conditionals
-        # to find direction of cell2 relative cell1 is too complex
-        connection_indices = {
-            self.BOTTOM: self.left_child_idx(c1_level, c1_idx),
-            self.BOTTOM_RIGHT: self.right_child_idx(c1_level, c1_idx),
-            self.TOP_RIGHT: self.right_cell_idx(c1_level, c1_idx),
-            self.TOP: self.right_parent_idx(c1_level, c1_idx),
-            self.TOP_LEFT: self.left_parent_idx(c1_level, c1_idx),
-            self.BOTTOM_LEFT: self.left_cell_idx(c1_level, c1_idx)
-        }
-
-        # return the direction where the cell matches the other
-        for direction, idx in connection_indices.items():
-            if idx == cell2:
-                return direction
+        return self.topology.slot_of(cell1, cell2)
 
     def is_connected_to(self, cell_1d, direction):
-        return self.spanning_tree[cell_1d][direction] == 1
+        return self.spanning_tree.is_connected(cell_1d, direction)
 
-    def draw_hexagonal_maze(self):
-        self.spanning_tree = self.create_dfs_tree()
+    def draw_hexagonal_maze(self, rng=None):
+        self.spanning_tree = self.create_dfs_tree(rng)
 
         # relative to origin, the starting point of first hexagon (bottom-left vertex)
         x = - self.side_len * (self.num_levels - self.num_cells_at_level[0] / 2)
         y = self.y_component * (self.num_levels - self.num_cells_at_level[0] - 1)
 
+        # cells are drawn in the same order as their 1d indices
+        cell_1d = -1
+
         for level in range(self.num_levels):
             prev_x = x
             prev_y = y
@@ -258,7 +316,7 @@ class HexagonalMaze:
                 self.clr_scheme.next_color(color)
 
                 # get 1d index of cell
-                cell_1d = self.index_1d(level, cell)
+                cell_1d += 1
 
                 # draw bottom
                 # to add gate, skip first cell of last level
@@ -288,16 +346,12 @@ class HexagonalMaze:
                 '''
                 for certain boundary cells, draw other edges too. Refer to 
                 gallery/original-hexagon-for-maze-open-ends.PNG
+                these are the edges that have no neighbour on the other side
+                (these edges can't be connected either)
                 '''
-                is_first_level = level == 0
-                is_first_cell = cell == 0
-
-                # number of cells increase in each level up until middle level
-                is_num_cells_increasing = level <= self.middle_level
-
-                should_draw_top = is_first_level or (self.is_last_cell(level, cell) and is_num_cells_increasing)
-                should_draw_left_top = is_first_level or (is_first_cell and is_num_cells_increasing)
-                should_draw_left_bottom = is_first_cell
+                should_draw_top = self.topology.neighbour(cell_1d, self.TOP) == NO_NEIGHBOUR
+                should_draw_left_top = self.topology.neighbour(cell_1d, self.TOP_LEFT) == NO_NEIGHBOUR
+                should_draw_left_bottom = self.topology.neighbour(cell_1d, self.BOTTOM_LEFT) == NO_NEIGHBOUR
 
                 penup()
 
@@ -305,21 +359,21 @@ class HexagonalMaze:
                 # for top gate too, top edge should be skipped
                 is_top_gate = level == 0 and self.is_last_cell(level, cell)
 
-                if should_draw_top and not self.is_connected_to(cell_1d, self.TOP) and not is_top_gate:
+                if should_draw_top and not is_top_gate:
                     pendown()
                 left(60)
                 forward(self.side_len)
                 penup()
 
                 # top left edge
-                if should_draw_left_top and not self.is_connected_to(cell_1d, self.TOP_LEFT):
+                if should_draw_left_top:
                     pendown()
                 left(60)
                 forward(self.side_len)
                 penup()
 
                 # bottom left edge
-                if should_draw_left_bottom and not self.is_connected_to(cell_1d, self.BOTTOM_LEFT):
+                if should_draw_left_bottom:
                     pendown()
                 left(60)
                 forward(self.side_len)
@@ -338,6 +392,68 @@ class HexagonalMaze:
                 x = prev_x + 1.5 * self.side_len
                 y = prev_y - self.y_component
 
+    def wall_segments(self, spanning_tree):
+        '''
+        the walls drawn by draw_hexagonal_maze, as segments in turtle coordinates.
+        like there, every hexagon adds its bottom, bottom right & top right edges,
+        and the other edges only on the boundary of the maze
+        '''
+        side = self.side_len
+        y_comp = self.y_component
+        neighbours = self.topology.neighbours
+
+        segments = []
+
+        # relative to origin, the starting point of first hexagon (bottom-left vertex)
+        x = - side * (self.num_levels - self.num_cells_at_level[0] / 2)
+        y = y_comp * (self.num_levels - self.num_cells_at_level[0] - 1)
+
+        cell_1d = -1
+
+        for level in range(self.num_levels):
+            prev_x = x
+            prev_y = y
+
+            for cell in range(self.num_cells_at_level[level]):
+                cell_1d += 1
+
+                # vertices counter clockwise from bottom-left, edge i is between vertex i & i+1
+                vertices = (
+                    (x, y), (x + side, y), (x + 1.5 * side, y + y_comp),
+                    (x + side, y + 2 * y_comp), (x, y + 2 * y_comp), (x - 0.5 * side, y + y_comp), (x, y)
+                )
+
+                is_bottom_gate = cell == 0 and level == self.num_levels - 1
+                is_top_gate = level == 0 and self.is_last_cell(level, cell)
+
+                for direction in range(6):
+                    if direction <= self.TOP_RIGHT:
+                        # shared edges, drawn if cells are not connected
+                        is_wall = not spanning_tree.is_connected(cell_1d, direction)
+                    else:
+                        # only drawn on boundary
+                        is_wall = neighbours[6 * cell_1d + direction] == NO_NEIGHBOUR
+
+                    if direction == self.BOTTOM and is_bottom_gate or direction == self.TOP and is_top_gate:
+                        is_wall = False
+
+                    if is_wall:
+                        segments.append((vertices[direction], vertices[direction + 1]))
+
+                x += 1.5 * side
+                y += y_comp
+
+            # if cells in the next level are more than current level
+            # starting x will stay the same
+            if level < self.num_levels - 1 and self.num_cells_at_level[level] < self.num_cells_at_level[level + 1]:
+                x = prev_x
+                y = prev_y - 2 * y_comp
+            else:
+                x = prev_x + 1.5 * side
+                y = prev_y - y_comp
+
+        return segments
+
     def draw_hexagons(self):
         # relative to origin, the starting point of first hexagon (bottom-left vertex)
         x = - self.side_len * (self.num_levels - self.num_cells_at_level[0] / 2)
@@ -0,0 +1,200 @@
+'''
+Draws mazes of any shape into an image without turtle (no display needed)
+
+Every shape computes the walls of a maze from its spanning tree, in the same
+coordinates turtle uses (origin at the center, y pointing up):
+* segments: ((x1, y1), (x2, y2)) straight walls
+* arcs: (radius, start_angle, end_angle) walls along circles around the origin,
+  angles in degrees counter-clockwise from the x axis (only circular mazes have them)
+
+render_walls draws all of them with PIL in a single pass over the walls.
+
+Circular mazes have far more walls than the other shapes for the same size, and
+PIL draws arcs slowly. render_circular_maze draws them with NumPy instead: every
+pixel is converted to polar coordinates once and checked against the walls of the
+cell it falls in, so the time depends on the image size and not on the number of walls.
+'''
+import math
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+
+
+Point = Tuple[float, float]
+Segment = Tuple[Point, Point]
+Arc = Tuple[float, float, float]
+
+
+def walls_bounding_box(segments: List[Segment], arcs: List[Arc]):
+    # smallest box (min_x, min_y, max_x, max_y) containing all the walls
+    xs = [x for segment in segments for x, _ in segment]
+    ys = [y for segment in segments for _, y in segment]
+
+    if len(arcs) > 0:
+        # arcs are parts of circles around origin, the biggest circle contains all of them
+        max_radius = max(radius for radius, _, _ in arcs)
+        xs += [-max_radius, max_radius]
+        ys += [-max_radius, max_radius]
+
+    if len(xs) == 0:
+        return 0, 0, 0, 0
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def render_walls(segments: List[Segment], arcs: List[Arc] = (), line_width=2, margin=10,
+                 wall_color='black', bg_color='white') -> Image.Image:
+    # returns an RGB image of the walls, with margin pixels around them
+
+    min_x, min_y, max_x, max_y = walls_bounding_box(segments, arcs)
+
+    width = int(max_x - min_x) + 2 * margin + 1
+    height = int(max_y - min_y) + 2 * margin + 1
+
+    # image coordinates: origin at top left and y pointing down
+    offset_x = margin - min_x
+    offset_y = margin + max_y
+
+    image = Image.new('RGB', (width, height), bg_color)
+    draw = ImageDraw.Draw(image)
+
+    for (x1, y1), (x2, y2) in segments:
+        draw.line(
+            (x1 + offset_x, offset_y - y1, x2 + offset_x, offset_y - y2),
+            fill=wall_color, width=line_width
+        )
+
+    for radius, start_angle, end_angle in arcs:
+        # the y axis is flipped, so counter-clockwise angles become clockwise ones (which PIL uses)
+        draw.arc(
+            (offset_x - radius, offset_y - radius, offset_x + radius, offset_y + radius),
+            -end_angle, -start_angle, fill=wall_color, width=line_width
+        )
+
+    return image
+
+
+def circular_wall_masks(maze, graph):
+    '''
+    classifies the walls of every cell of a circular maze at once, with array lookups in the bitmasks
+    of the spanning tree. returns parent_walls & left_walls, boolean arrays indexed by 1D index of cell:
+    True if there's a wall between the cell & its parent (inner arc) or left cell (straight line)
+    '''
+    passages = np.frombuffer(graph.passages, dtype=np.uint16 if graph.passages.itemsize == 2 else np.uint8)
+
+    parent_walls = (passages >> maze.PARENT) & 1 == 0
+    left_walls = (passages >> maze.LEFT) & 1 == 0
+
+    # center cell has no parent or left cell, the arcs around it are the parent walls of level-1
+    parent_walls[0] = False
+    left_walls[0] = False
+
+    return parent_walls, left_walls
+
+
+def render_circular_maze(maze, graph, rng=None, line_width=2, margin=10,
+                         wall_color='black', bg_color='white', rows_per_strip=64) -> Image.Image:
+    '''
+    draws the same walls as CircularMaze.wall_segments & wall_arcs (and about the same image size as
+    render_walls would), rows_per_strip rows of pixels at a time to keep memory bounded.
+
+    every level has a multiple of 4 cells, so rotating the maze by 90 degrees moves every cell
+    exactly num_cells/4 cells ahead. the polar coordinates (and cells) of the pixels are only
+    computed for the top right quarter of the image, the other quarters reuse them with the
+    cells shifted by 1/4, 2/4 & 3/4 of their level
+    '''
+    line_length = maze.line_length
+    num_levels = maze.num_levels
+
+    parent_walls, left_walls = circular_wall_masks(maze, graph)
+
+    # the outer boundary is the parent wall of a (virtual) level after the last one,
+    # with the same cells as the last level, except the entrance
+    num_cells_at_level = np.array(maze.num_cells_at_level + maze.num_cells_at_level[-1:], dtype=np.int32)
+    boundary_walls = np.ones(maze.num_cells_at_level[-1], dtype=bool)
+    boundary_walls[maze.entrance_cell(rng)] = False
+    parent_walls = np.concatenate((parent_walls, boundary_walls))
+
+    # per level tables: 1D index of first cell & angle of one cell (radians).
+    # float32 is precise enough for pixels and makes arctan2 & co several times faster
+    first_cells = np.concatenate(([0], np.cumsum(num_cells_at_level)[:-1])).astype(np.int32)
+    arc_angles = (2 * np.pi / num_cells_at_level).astype(np.float32)
+
+    # center of the maze is the center of a pixel, so the quarters are the same size
+    center = margin + math.ceil(num_levels * line_length)
+    size = 2 * center + 1
+
+    # distances are measured in units of line_length, angles in turns (1 turn = 360 degrees)
+    half_width = np.float32(line_width / 2 / line_length)
+
+    # top right quarter: x from 1 to center (columns), y from center to 0 (rows)
+    xs = np.arange(1, center + 1, dtype=np.float32)[None, :]
+
+    mask = np.zeros((size, size), dtype=bool)
+
+    for strip_start in range(0, center + 1, rows_per_strip):
+        strip_end = min(center + 1, strip_start + rows_per_strip)
+
+        ys = (center - np.arange(strip_start, strip_end, dtype=np.float32))[:, None]
+
+        dist = np.hypot(xs, ys) / np.float32(line_length)
+        turns = np.arctan2(ys, xs) / np.float32(2 * np.pi)
+
+        # arcs: pixels close to circle of a level boundary (1 to num_levels)
+        ring = np.rint(dist)
+        on_ring = (np.abs(dist - ring) < half_width) & (ring >= 1) & (ring <= num_levels)
+
+        ring = np.clip(ring.astype(np.int32), 1, num_levels)
+        ring_cells = num_cells_at_level[ring]
+        ring_first_cell = first_cells[ring]
+        arc_cell = np.minimum((turns * ring_cells).astype(np.int32), ring_cells - 1)
+
+        # straight walls: pixels inside a level (1 to num_levels - 1) close to the left boundary of a cell
+        level = np.clip(dist.astype(np.int32), 1, num_levels - 1)
+        in_level = (dist >= 1) & (dist < num_levels)
+
+        level_cells = num_cells_at_level[level]
+        level_first_cell = first_cells[level]
+        position = turns * level_cells
+        line_cell = np.rint(position)
+        near_line = in_level & (np.abs(position - line_cell) * arc_angles[level] * dist < half_width)
+        line_cell = line_cell.astype(np.int32)
+
+        for quarter in range(4):
+            # cells of the pixels of this strip, rotated by quarter * 90 degrees
+            rotated_arc_cell = arc_cell + quarter * (ring_cells // 4)
+            rotated_arc_cell[rotated_arc_cell >= ring_cells] -= ring_cells[rotated_arc_cell >= ring_cells]
+
+            rotated_line_cell = line_cell + quarter * (level_cells // 4)
+            rotated_line_cell[rotated_line_cell >= level_cells] -= level_cells[rotated_line_cell >= level_cells]
+
+            wall_pixels = on_ring & parent_walls[ring_first_cell + rotated_arc_cell]
+            wall_pixels |= near_line & left_walls[level_first_cell + rotated_line_cell]
+
+            # where this strip of the top right quarter is after rotating it counter-clockwise
+            wall_pixels = np.rot90(wall_pixels, quarter)
+            if quarter == 0:
+                mask[strip_start:strip_end, center + 1:] = wall_pixels
+            elif quarter == 1:
+                mask[:center, strip_start:strip_end] = wall_pixels
+            elif quarter == 2:
+                mask[size - strip_end:size - strip_start, :center] = wall_pixels
+            else:
+                mask[center + 1:, size - strip_end:size - strip_start] = wall_pixels
+
+    image = Image.new('RGB', (size, size), bg_color)
+    image.paste(ImageColor.getrgb(wall_color), mask=Image.fromarray(mask))
+    return image
+
+
+def render_maze(maze, spanning_tree, rng=None, **kwargs) -> Image.Image:
+    '''
+    draws a maze of any shape (RectMaze, TriangularMaze, HexagonalMaze, CircularMaze) from its spanning tree.
+    rng picks the entrance of circular mazes. kwargs are passed to render_walls (render_circular_maze for
+    circular mazes)
+    '''
+    if hasattr(maze, 'wall_arcs'):
+        return render_circular_maze(maze, spanning_tree, rng, **kwargs)
+
+    return render_walls(maze.wall_segments(spanning_tree), **kwargs)
@@ -0,0 +1,210 @@
+'''
+Saves mazes of any shape as SVG
+
+The walls come from the shapes (see maze_renderer.py), one short wall per cell edge.
+Before writing them:
+* collinear walls that touch or overlap are merged into a single segment
+* arcs on the same circle that touch are merged into a single arc (a whole
+  ring of circular maze becomes one arc if none of its walls is open)
+* segments sharing end points are chained into polylines
+Everything is written as a single <path>, so a big maze is a few long strokes
+instead of hundreds of thousands of tiny ones.
+'''
+import math
+from collections import defaultdict, deque
+from typing import List
+
+from maze_renderer import Arc, Segment, walls_bounding_box
+
+
+# coordinates closer than this are the same point
+TOLERANCE = 1e-6
+
+
+def point_key(point):
+    return round(point[0] / TOLERANCE), round(point[1] / TOLERANCE)
+
+
+def merge_segments(segments: List[Segment]) -> List[Segment]:
+    # merges the collinear segments that touch or overlap
+    lines = defaultdict(list)
+
+    for start, end in segments:
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+        length = math.hypot(dx, dy)
+        if length < TOLERANCE:
+            continue
+
+        # same direction for both ends of a line: pointing right, or up if vertical
+        if dx < -TOLERANCE or (dx <= TOLERANCE and dy < 0):
+            start, end = end, start
+            dx, dy = -dx, -dy
+
+        ux, uy = dx / length, dy / length
+
+        # a line is identified by its direction & distance from origin,
+        # its segments by their position along the line
+        line = (round(ux / TOLERANCE), round(uy / TOLERANCE), round((ux * start[1] - uy * start[0]) / TOLERANCE))
+        position = ux * start[0] + uy * start[1]
+        lines[line].append((position, position + length, start, end))
+
+    merged = []
+    for line_segments in lines.values():
+        line_segments.sort(key=lambda seg: seg[0])
+
+        _, end_pos, start, end = line_segments[0]
+        for seg_start_pos, seg_end_pos, seg_start, seg_end in line_segments[1:]:
+            if seg_start_pos <= end_pos + TOLERANCE:
+                if seg_end_pos > end_pos:
+                    end_pos, end = seg_end_pos, seg_end
+            else:
+                merged.append((start, end))
+                end_pos, start, end = seg_end_pos, seg_start, seg_end
+
+        merged.append((start, end))
+
+    return merged
+
+
+def merge_arcs(arcs: List[Arc]) -> List[Arc]:
+    # merges the arcs of the same circle that touch or overlap. angles are in [0, 360]
+    circles = defaultdict(list)
+    for radius, start_angle, end_angle in arcs:
+        circles[round(radius / TOLERANCE)].append((start_angle, end_angle, radius))
+
+    merged = []
+    for circle_arcs in circles.values():
+        circle_arcs.sort()
+
+        runs = []
+        start_angle, end_angle, radius = circle_arcs[0]
+        for arc_start, arc_end, _ in circle_arcs[1:]:
+            if arc_start <= end_angle + TOLERANCE:
+                end_angle = max(end_angle, arc_end)
+            else:
+                runs.append([radius, start_angle, end_angle])
+                start_angle, end_angle = arc_start, arc_end
+        runs.append([radius, start_angle, end_angle])
+
+        # the run ending at 360 degrees continues in the one starting at 0
+        if len(runs) > 1 and runs[0][1] <= TOLERANCE and runs[-1][2] >= 360 - TOLERANCE:
+            runs[0][1] = runs[-1][1] - 360
+            runs.pop()
+
+        merged.extend(tuple(run) for run in runs)
+
+    return merged
+
+
+def chain_segments(segments: List[Segment]):
+    # joins the segments that share end points into polylines (lists of points)
+    segments_at = defaultdict(list)
+    for idx, (start, end) in enumerate(segments):
+        segments_at[point_key(start)].append(idx)
+        segments_at[point_key(end)].append(idx)
+
+    used = bytearray(len(segments))
+
+    def next_point(point):
+        # the other end of an unused segment starting at point, None if there's none
+        candidates = segments_at[point_key(point)]
+        while candidates:
+            idx = candidates.pop()
+            if not used[idx]:
+                used[idx] = 1
+                start, end = segments[idx]
+                return end if point_key(start) == point_key(point) else start
+        return None
+
+    polylines = []
+    for idx, (start, end) in enumerate(segments):
+        if used[idx]:
+            continue
+        used[idx] = 1
+
+        polyline = deque([start, end])
+
+        point = next_point(end)
+        while point is not None:
+            polyline.append(point)
+            point = next_point(point)
+
+        point = next_point(start)
+        while point is not None:
+            polyline.appendleft(point)
+            point = next_point(point)
+
+        polylines.append(polyline)
+
+    return polylines
+
+
+def format_number(value):
+    # shortest text for coordinates, 2 decimals are more than enough for pixels
+    text = f'{value:.2f}'.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+def walls_to_svg(segments: List[Segment], arcs: List[Arc] = (), line_width=2, margin=10,
+                 wall_color='black', bg_color='white') -> str:
+    segments = merge_segments(segments)
+    arcs = merge_arcs(arcs)
+
+    min_x, min_y, max_x, max_y = walls_bounding_box(segments, arcs)
+
+    # svg y axis points down, so every y is negated
+    def point_text(point):
+        return f'{format_number(point[0])} {format_number(-point[1])}'
+
+    path = []
+
+    for polyline in chain_segments(segments):
+        points = iter(polyline)
+        path.append('M' + point_text(next(points)))
+        path.extend('L' + point_text(point) for point in points)
+
+    for radius, start_angle, end_angle in arcs:
+        span = end_angle - start_angle
+
+        # a full circle can't be a single svg arc (same start & end point), split it in two halves
+        num_parts = 2 if span >= 360 - TOLERANCE else 1
+        part_span = span / num_parts
+
+        start = math.radians(start_angle)
+        path.append('M' + point_text((radius * math.cos(start), radius * math.sin(start))))
+
+        for part in range(1, num_parts + 1):
+            end = math.radians(start_angle + part * part_span)
+            large_arc = 1 if part_span > 180 else 0
+            r = format_number(radius)
+
+            # sweep 0: counter-clockwise on screen, same as the angles
+            path.append(f'A{r} {r} 0 {large_arc} 0 ' + point_text((radius * math.cos(end), radius * math.sin(end))))
+
+    x = min_x - margin
+    y = -max_y - margin
+    width = max_x - min_x + 2 * margin
+    height = max_y - min_y + 2 * margin
+    view_box = ' '.join(format_number(value) for value in (x, y, width, height))
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}" '
+        f'width="{format_number(width)}" height="{format_number(height)}">\n'
+        f'<rect x="{format_number(x)}" y="{format_number(y)}" width="100%" height="100%" fill="{bg_color}"/>\n'
+        f'<path d="{"".join(path)}" fill="none" stroke="{wall_color}" stroke-width="{line_width}" '
+        f'stroke-linecap="round" stroke-linejoin="round"/>\n'
+        '</svg>\n'
+    )
+
+
+def save_maze_svg(maze, spanning_tree, file_name, rng=None, **kwargs):
+    '''
+    saves a maze of any shape (RectMaze, TriangularMaze, HexagonalMaze, CircularMaze) as SVG.
+    rng picks the entrance of circular mazes. kwargs are passed to walls_to_svg
+    '''
+    segments = maze.wall_segments(spanning_tree)
+    arcs = maze.wall_arcs(spanning_tree, rng) if hasattr(maze, 'wall_arcs') else []
+
+    with open(file_name, 'w') as svg_file:
+        svg_file.write(walls_to_svg(segments, arcs, **kwargs))
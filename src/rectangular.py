@@ -1,5 +1,9 @@
 import math
-from turtle import *
+try:
+    from turtle import *
+except ImportError:
+    # no Tk on this machine, mazes can still be drawn with maze_renderer
+    pass
 from algorithms.prims_randomized import PrimsRandomized
 import time
 
@@ -10,6 +14,9 @@ class RectMaze:
         self.n = n
         self.sideLen = sideLen
 
+        # creates the spanning trees, its topology is shared by every maze of this size
+        self.prims = PrimsRandomized(n)
+
     def create_square(self):
         side = self.sideLen * 5
         x = - side / 2
@@ -48,10 +55,10 @@ class RectMaze:
             y -= self.sideLen
             goto(x, y)
 
-    def create_maze(self):
+    def create_maze(self, rng=None):
 
-        pr = PrimsRandomized(n)
-        mst = pr.prims_mst()
+        pr = self.prims
+        mst = pr.prims_mst_frontier(rng)
 
         x = - (self.n / 2) * self.sideLen
         y = - x
@@ -67,7 +74,7 @@ class RectMaze:
 
                 # if node is connected to the node in TOP direction
                 # do not draw the line
-                if mst[node][pr.TOP] == 1:
+                if mst.is_connected(node, pr.TOP):
                     penup()
 
                 forward(self.sideLen)
@@ -76,14 +83,14 @@ class RectMaze:
 
                 # if connected to the node on the right
                 # or the current node is the last node, keep the right side open (for the exit gate)
-                if mst[node][pr.RIGHT] == 1 or node == self.n ** 2 - 1:
+                if mst.is_connected(node, pr.RIGHT) or node == self.n ** 2 - 1:
                     penup()
 
                 forward(self.sideLen)
                 right(90)
                 pendown()
 
-                if mst[node][pr.BOTTOM] == 1:
+                if mst.is_connected(node, pr.BOTTOM):
                     penup()
 
                 forward(self.sideLen)
@@ -91,7 +98,7 @@ class RectMaze:
                 pendown()
 
                 # for the first node, keep the left gate open (entrance)
-                if mst[node][pr.LEFT] == 1 or node == 0:
+                if mst.is_connected(node, pr.LEFT) or node == 0:
                     penup()
 
                 forward(self.sideLen)
@@ -104,6 +111,45 @@ class RectMaze:
             penup()
             goto(x, y)
 
+    def wall_segments(self, mst):
+        '''
+        the walls drawn by create_maze for the spanning tree mst (of PrimsRandomized), as segments
+        in turtle coordinates. every wall is listed once: the top & left walls of every cell,
+        plus the right & bottom boundary
+        '''
+        pr = self.prims
+        side = self.sideLen
+
+        x0 = - (self.n / 2) * side
+        y0 = - x0
+
+        segments = []
+
+        for row in range(self.n):
+            y = y0 - row * side
+
+            for col in range(self.n):
+                node = row * self.n + col
+                x = x0 + col * side
+
+                if not mst.is_connected(node, pr.TOP):
+                    segments.append(((x, y), (x + side, y)))
+
+                # for the first node, keep the left gate open (entrance)
+                if not mst.is_connected(node, pr.LEFT) and node != 0:
+                    segments.append(((x, y - side), (x, y)))
+
+            # right boundary, except the exit gate of the last node
+            if row < self.n - 1:
+                x = x0 + self.n * side
+                segments.append(((x, y), (x, y - side)))
+
+        # bottom boundary
+        y = y0 - self.n * side
+        segments.append(((x0, y), (x0 + self.n * side, y)))
+
+        return segments
+
     def save_screenshot(self):
         ts = getscreen()
         ts.getcanvas().postscript(file=f"gallery/{math.floor(time.time())}.eps")
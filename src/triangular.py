@@ -1,10 +1,16 @@
 import math
 import pprint
-import random
-from turtle import *
+try:
+    from turtle import *
+except ImportError:
+    # no Tk on this machine, mazes can still be drawn with maze_renderer
+    pass
 from typing import Tuple
 
 from algorithms.disjoint_set import DisjointSet
+from algorithms.level_layout import TriangularLayout
+from algorithms.maze_graph import MazeGraph, MazeTopology, NO_NEIGHBOUR
+from algorithms.random_source import make_rng
 from src.color_scheme import ColorScheme
 
 
@@ -35,12 +41,32 @@ class TriangularMaze:
         self.num_cells_at_level = [2 * lvl + 1 for lvl in range(num_levels)]
         self.total_cells = sum(self.num_cells_at_level)
 
+        # converts between 1D & 2D indices
+        self.layout = TriangularLayout(num_levels)
+
         # compute the length of perpendicular dividing the equilateral triangle into
         # 2 right angled triangles.
         self.triangle_height = self.compute_triangle_height(self.side_len)
 
         self.clr_scheme = ColorScheme()
 
+        self.topology = self.create_topology()
+
+    def create_topology(self):
+        # each cell has a slot for TOP, LEFT, RIGHT, BOTTOM neighbours
+        # only odd indexed (inverted) triangles have a TOP and only even indexed ones have a BOTTOM
+        neighbours = [NO_NEIGHBOUR for _ in range(4 * self.total_cells)]
+
+        for cell1, cell2 in self.get_graph_edges():
+            direction = self.get_neighbour_dir(cell1, cell2)
+            neighbours[4 * cell1 + direction] = cell2
+
+            neighbour_dir = self.get_neighbour_dir(cell2, cell1)
+            neighbours[4 * cell2 + neighbour_dir] = cell1
+
+        # TOP <-> BOTTOM, LEFT <-> RIGHT
+        return MazeTopology.fixed_degree(neighbours, 4, opposite=(self.BOTTOM, self.RIGHT, self.LEFT, self.TOP))
+
     def compute_triangle_height(self, side):
         # apply Pythagoras theorem
         base = side / 2
@@ -69,28 +95,27 @@ class TriangularMaze:
 
                 if tri % 2 == 0 and lvl < self.num_levels - 1:
                     # all even indexed triangles are connected downward
-                    child_1d = sum(self.num_cells_at_level[:lvl + 1]) + tri + 1  # index of child
+                    child_1d = self.index_1d(lvl + 1, tri + 1)  # index of child
                     edges.append((cell_1d, child_1d))
 
         return edges
 
-    def kruskal_spanning_tree(self, edges):
+    def kruskal_spanning_tree(self, edges, rng=None):
         # creates Spanning Tree using Randomized Kruskal's:
         # Creates a Spanning Tree for given graph while picking edges at random and
         # including their vertices in the graph if not already in such a way that there are no cycles
+        rng = make_rng(rng)
 
         # the minimum spanning tree has no edges in the start
-        # PARENT, LEFT, RIGHT, CHILD
-        spanning_tree = {
-            cell: [0, 0, 0, 0] for cell in range(self.total_cells)
-        }
+        # TOP, LEFT, RIGHT, BOTTOM
+        spanning_tree = MazeGraph(self.topology)
 
         # cell indices will be used in disjoint set and then to map back to real edge
         cells = [idx for idx in range(self.total_cells)]
 
         disjoint = DisjointSet(cells)
 
-        random.shuffle(edges)
+        rng.shuffle(edges)
 
         for edge in edges:
             # pick one edge at random, connecting to a new cell that is not already in visited.
@@ -100,30 +125,15 @@ class TriangularMaze:
             if disjoint.find(cell1) != disjoint.find(cell2):
                 disjoint.union(cell1, cell2)
 
-                # connect these two nodes in the spanning tree
+                # connect these two nodes in the spanning tree (and vice versa)
                 direction = self.get_neighbour_dir(cell1, cell2)
-                spanning_tree[cell1][direction] = 1
-
-                # also set it vice versa
-                neighbour_dir = self.get_neighbour_dir(cell2, cell1)
-                spanning_tree[cell2][neighbour_dir] = 1
+                spanning_tree.connect(cell1, direction)
 
         return spanning_tree
 
     def index_2d(self, cell_1d) -> Tuple[int, int]:
         # takes index of cell in 1-D array form and converts to 2D
-        if cell_1d >= self.total_cells:
-            raise Exception("1D index greater than total number of cells")
-
-        level = 0
-        while cell_1d - self.num_cells_at_level[level] >= 0:
-            cell_1d -= self.num_cells_at_level[level]
-            level += 1
-
-        # the remaining cells give the index of cell at current level
-        cell = cell_1d
-
-        return level, cell
+        return self.layout.index_2d(cell_1d)
 
     def get_neighbour_dir(self, cell1, cell2):
         '''
@@ -149,10 +159,7 @@ class TriangularMaze:
 
     def index_1d(self, level, cell):
         # takes the level & cell (the 2D indices) and converts them to their corresponding 1D index
-        if level >= self.num_levels:
-            raise Exception("level greather than maze levels")
-
-        return sum(self.num_cells_at_level[:level]) + cell
+        return self.layout.index_1d(level, cell)
 
     def draw_triangular_maze(self, spanning_tree):
 
@@ -186,7 +193,7 @@ class TriangularMaze:
                 # if not self.is_connected_to(level, cell, self.CHILD):
                 #     pendown()
                 # draw bottom line if cell is not connected to its child
-                if spanning_tree[cell_1d][self.BOTTOM] == 0:
+                if not spanning_tree.is_connected(cell_1d, self.BOTTOM):
                     pendown()
 
                 # draw bottom
@@ -195,7 +202,7 @@ class TriangularMaze:
                 penup()
 
                 # draw right edge
-                if spanning_tree[cell_1d][self.RIGHT] == 0:
+                if not spanning_tree.is_connected(cell_1d, self.RIGHT):
                     pendown()
 
                 left(120)
@@ -210,7 +217,7 @@ class TriangularMaze:
                 is_left_most_cell = level == self.num_levels - 1 and cell == 0
 
                 # if not self.is_connected_to(level, cell, self.LEFT) and not is_first_cell and not is_left_most_cell:
-                if spanning_tree[cell_1d][self.LEFT] == 0 and not is_first_cell and not is_left_most_cell:
+                if not spanning_tree.is_connected(cell_1d, self.LEFT) and not is_first_cell and not is_left_most_cell:
                     pendown()
 
                 left(120)
@@ -220,6 +227,44 @@ class TriangularMaze:
                 # now draw the triangle towards its right
                 x += self.side_len
 
+    def wall_segments(self, spanning_tree):
+        '''
+        the walls drawn by draw_triangular_maze, as segments in turtle coordinates.
+        like there, only the even indexed (upright) triangles are visited, their edges
+        are also the edges of the inverted triangles between them
+        '''
+        side = self.side_len
+        height = self.triangle_height
+
+        segments = []
+
+        # the highest point of diagram, top tip of level-0 triangle
+        y = self.num_levels * height / 2
+
+        for level in range(self.num_levels):
+            x = - (level + 1) * side / 2
+            y -= height
+
+            for cell in range(0, self.num_cells_at_level[level], 2):
+                cell_1d = self.index_1d(level, cell)
+
+                if not spanning_tree.is_connected(cell_1d, self.BOTTOM):
+                    segments.append(((x, y), (x + side, y)))
+
+                if not spanning_tree.is_connected(cell_1d, self.RIGHT):
+                    segments.append(((x + side, y), (x + side / 2, y + height)))
+
+                # gates at the top & left most cells
+                is_first_cell = level == 0 and cell == 0
+                is_left_most_cell = level == self.num_levels - 1 and cell == 0
+
+                if not spanning_tree.is_connected(cell_1d, self.LEFT) and not is_first_cell and not is_left_most_cell:
+                    segments.append(((x + side / 2, y + height), (x, y)))
+
+                x += side
+
+        return segments
+
     def draw_pyramid_of_triangles(self):
         # to visualize the initial state of diagram before maze edges are opened
 